@@ -1,42 +1,17 @@
+import argparse
 import os
-import shutil
-from datetime import datetime
-from scripts.file_loader import load_employee_data
-from scripts.employee_leave_report_generator import generate_leave_report
-from scripts.departmental_leave_report_generator import generate_departmental_leave_report
-
-
-def safe_remove_directory(directory):
-    """Safely remove a directory and its contents with error handling."""
-    if not os.path.exists(directory):
-        return
-
-    try:
-        shutil.rmtree(directory)
-    except PermissionError:
-        try:
-            for root, dirs, files in os.walk(directory):
-                for file in files:
-                    try:
-                        file_path = os.path.join(root, file)
-                        os.unlink(file_path)
-                    except Exception:
-                        pass
-            
-            for root, dirs, files in os.walk(directory, topdown=False):
-                for dir_name in dirs:
-                    try:
-                        dir_path = os.path.join(root, dir_name)
-                        os.rmdir(dir_path)
-                    except Exception:
-                        pass
-                        
-            try:
-                os.rmdir(directory)
-            except Exception:
-                pass
-        except Exception:
-            print("Warning: Directory cleanup incomplete - continuing with existing directory...")
+from datetime import date
+from scripts.absence_forecast import DEFAULT_WINDOW_DAYS
+from scripts.coverage_analysis import COVERAGE_CONFIG_FILE
+from scripts.exclusion_rules import EXCLUSION_RULES_FILE, ExclusionRules
+from scripts.location_groups import LOCATION_GROUPS_FILE, load_location_groups
+from scripts.report_pipeline import (CACHE_DIR_NAME, EMPLOYEE_STATE_FILE, REPORT_DAYS_AFTER, REPORT_DAYS_BEFORE,
+                                     STATUS_CODES_FILE, default_store_path, export_stored_leave,
+                                     list_store_snapshots, run_report_pipeline)
+from scripts.report_server import serve_reports
+from scripts.batch_runner import run_batch
+from scripts.watch_mode import watch_reports
+from scripts.workbook_saver import DEFAULT_COMPRESS_LEVEL
 
 
 def get_relative_path(full_path, base_dir):
@@ -47,39 +22,122 @@ def get_relative_path(full_path, base_dir):
         return full_path
 
 
-# In report.py, update the main function:
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate leave reports from Humanforce exports.")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and regenerate the reports whenever new exports land")
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help="Seconds between checks of the input folder in watch mode")
+    parser.add_argument('--settle-seconds', type=float, default=3.0,
+                        help="Seconds the exports must be unchanged before they are processed in watch mode")
+    parser.add_argument('--days-before', type=int, default=REPORT_DAYS_BEFORE,
+                        help="Days before today to include in the reports")
+    parser.add_argument('--days-after', type=int, default=REPORT_DAYS_AFTER,
+                        help="Days after today to include in the reports")
+    parser.add_argument('--full-horizon', action='store_true',
+                        help="Report every leave date in the exports, ignoring --days-before/--days-after")
+    parser.add_argument('--store', nargs='?', const='', metavar='PATH',
+                        help="Also write each processed export to a SQLite leave history store "
+                             "(default Cache/leave_history.sqlite)")
+    parser.add_argument('--from-store', nargs='?', const=0, type=int, metavar='SNAPSHOT',
+                        help="Render from a stored snapshot instead of the exports (the latest if no id is given)")
+    parser.add_argument('--list-snapshots', action='store_true',
+                        help="List the snapshots in the leave history store and exit")
+    parser.add_argument('--leave-between', nargs=2, type=date.fromisoformat, metavar=('START', 'END'),
+                        help="Save the stored leave days between two YYYY-MM-DD dates as a CSV next to this "
+                             "script and exit, across every snapshot (or only the --from-store one)")
+    parser.add_argument('--serve', nargs='?', const=8765, type=int, metavar='PORT',
+                        help="Serve single sheets as xlsx/csv/json on http://127.0.0.1:PORT/ (default 8765)")
+    parser.add_argument('--export-data', action='store_true',
+                        help="Also write the leave data as long-format CSV/Parquet tables for BI tools")
+    parser.add_argument('--skip-xlsx', action='store_true',
+                        help="Don't write the styled Excel reports (only the data tables and/or HTML)")
+    parser.add_argument('--table-workbook', action='store_true',
+                        help="Also write the leave data as one filterable Excel Table with summary sheets "
+                             "(with --skip-xlsx, instead of the styled reports)")
+    parser.add_argument('--html', action='store_true',
+                        help="Also write static HTML versions of both reports")
+    parser.add_argument('--rollup', choices=['week', 'month'],
+                        help="Also write a roll-up report with leave aggregated into week or month columns")
+    parser.add_argument('--coverage', nargs='?', const='', metavar='THRESHOLDS',
+                        help="Also list understaffed department days, using a JSON thresholds file "
+                             f"(default {COVERAGE_CONFIG_FILE} next to this script)")
+    parser.add_argument('--rolling-window', nargs='?', const=DEFAULT_WINDOW_DAYS, type=int, metavar='DAYS',
+                        help="Also summarise the peak absence per department over every DAYS-long window "
+                             f"(default {DEFAULT_WINDOW_DAYS})")
+    parser.add_argument('--location-groups', metavar='PATH',
+                        help="JSON file of location groups to give combined sheets "
+                             f"(default {LOCATION_GROUPS_FILE} next to this script)")
+    parser.add_argument('--exclusion-rules', metavar='PATH',
+                        help="JSON file of name keywords, name patterns and employee codes to leave out "
+                             f"(default {EXCLUSION_RULES_FILE} next to this script)")
+    parser.add_argument('--max-sheet-cells', type=int, default=None, metavar='CELLS',
+                        help="Split report sheets by date so none has more than this many cells")
+    parser.add_argument('--compress-level', type=int, choices=range(10), default=DEFAULT_COMPRESS_LEVEL,
+                        metavar='0-9',
+                        help="Zip compression level of the workbooks: 0 stores them uncompressed (fastest, "
+                             f"largest), 9 is smallest (default {DEFAULT_COMPRESS_LEVEL})")
+    parser.add_argument('--background-save', action='store_true',
+                        help="Save each workbook on a background thread while the next one renders")
+    parser.add_argument('--batch', nargs='+', metavar='FOLDER',
+                        help="Run every listed input folder (glob patterns allowed) in parallel")
+    parser.add_argument('--batch-output', metavar='DIR',
+                        help="Folder for the per-folder batch outputs (default 'Batch Reports' next to the script)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Maximum number of folders processed at once in batch mode (default: CPU count)")
+    return parser.parse_args()
+
 
 def main():
+    args = parse_args()
     base_dir = os.path.dirname(__file__)
     reports_dir = os.path.join(base_dir, 'Humanforce Reports')
-    
-    # Create date-specific folder name
-    current_date = datetime.now()
-    folder_name = current_date.strftime("Leave Report %d %b %Y")
-    output_dir = os.path.join(base_dir, folder_name)
 
-    # Safely remove existing directory if it exists
-    safe_remove_directory(output_dir)
-    
-    # Create fresh output directory
-    try:
-        os.makedirs(output_dir, exist_ok=True)
-    except Exception:
-        print("Warning: Using existing directory...")
+    horizon = None if args.full_horizon else (args.days_before, args.days_after)
+    output_options = {'export_data': args.export_data or (args.skip_xlsx and not (args.html or args.table_workbook)),
+                      'skip_xlsx': args.skip_xlsx, 'html': args.html, 'table_workbook': args.table_workbook,
+                      'rollup': args.rollup,
+                      'cell_budget': args.max_sheet_cells,
+                      'compress_level': args.compress_level, 'background_save': args.background_save,
+                      'coverage': (args.coverage or os.path.join(base_dir, COVERAGE_CONFIG_FILE)
+                                   if args.coverage is not None else None),
+                      'rolling_window': args.rolling_window,
+                      'location_groups': load_location_groups(args.location_groups or
+                                                              os.path.join(base_dir, LOCATION_GROUPS_FILE)),
+                      'exclusion_rules': ExclusionRules.load(args.exclusion_rules or
+                                                             os.path.join(base_dir, EXCLUSION_RULES_FILE))}
+    store_path = args.store or (default_store_path(base_dir) if args.store is not None else None)
 
-    # Load employee data
-    employee_data = load_employee_data(reports_dir)  # This returns a tuple of (employees, employee_manager)
+    if args.list_snapshots:
+        list_store_snapshots(store_path or default_store_path(base_dir))
+        return
+
+    if args.leave_between:
+        snapshot_id = 'all' if args.from_store is None else args.from_store or None
+        export_stored_leave(store_path or default_store_path(base_dir), *args.leave_between, base_dir,
+                            snapshot_id=snapshot_id)
+        return
 
-    if employee_data is None:
-        print("Error: Failed to load employee data.")
+    if args.batch:
+        output_root = args.batch_output or os.path.join(base_dir, 'Batch Reports')
+        run_batch(args.batch, output_root, max_workers=args.workers, horizon=horizon, **output_options)
         return
 
-    employees, employee_manager = employee_data  # Unpack the tuple
-    print(f"Processed {len(employees)} employees")
+    if args.serve is not None:
+        serve_reports(reports_dir, args.serve, horizon=horizon,
+                      state_path=os.path.join(base_dir, CACHE_DIR_NAME, EMPLOYEE_STATE_FILE),
+                      location_groups=output_options['location_groups'],
+                      exclusion_rules=output_options['exclusion_rules'],
+                      status_codes_path=os.path.join(base_dir, CACHE_DIR_NAME, STATUS_CODES_FILE))
+        return
+
+    if args.watch:
+        watch_reports(reports_dir, base_dir, args.poll_interval, args.settle_seconds,
+                      horizon=horizon, store_path=store_path, **output_options)
+        return
 
-    # Generate reports - pass both employees and employee_manager to both generators
-    generate_leave_report(employees, output_dir, employee_manager)
-    generate_departmental_leave_report(employees, output_dir, employee_manager)
+    run_report_pipeline(reports_dir, base_dir, horizon=horizon, store_path=store_path,
+                        from_store=args.from_store is not None, snapshot_id=args.from_store or None, **output_options)
 
 if __name__ == "__main__":
     main()
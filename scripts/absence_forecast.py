@@ -0,0 +1,162 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+
+from scripts.data_export import write_table
+from scripts.leave_rollup import department_membership, ratio_color, sum_by_department
+from scripts.workbook_saver import WorkbookSaver
+
+# Length of the rolling window in days when none is given
+DEFAULT_WINDOW_DAYS = 14
+
+
+def _rolling_max(values, window_days):
+    """Maximum of every window_days-long run along axis 1.
+
+    Windows of doubling width are built by taking the maximum of two overlapping
+    halves, so it takes log2(window_days) whole-array passes rather than one per day.
+    """
+    width, widest = 1, values
+    while width * 2 <= window_days:
+        widest = np.maximum(widest[:, :-width], widest[:, width:])
+        width *= 2
+    window_count = values.shape[1] - window_days + 1
+    return np.maximum(widest[:, :window_count], widest[:, window_days - width:window_days - width + window_count])
+
+
+def rolling_absence(leave_matrix, window_days=DEFAULT_WINDOW_DAYS):
+    """Absence per location/department over every window_days-long run of consecutive dates.
+
+    Returns (list of (location, department, headcount), window start indexes, and three
+    groups x windows arrays):
+    - employees_off: distinct employees off at any point in the window
+    - peak: most employees off on any one day of the window
+    - person_days: total days off in the window
+    Window sums come from differences of cumulative sums and window maximums from
+    _rolling_max, so there is no Python loop over groups, windows or employees.
+    """
+    rows, members, offsets = department_membership(leave_matrix)
+    on_leave = np.asarray(leave_matrix.status_codes) != 0
+    daily_counts = sum_by_department(on_leave, members, offsets)
+    day_count = daily_counts.shape[1]
+    window_days = max(1, min(window_days, day_count))
+    window_count = day_count - window_days + 1 if day_count else 0
+    if window_count == 0:
+        empty = np.zeros((len(rows), 0), dtype=np.int64)
+        return rows, np.arange(0), empty, empty, empty
+
+    totals = np.zeros((len(rows), day_count + 1), dtype=np.int64)
+    np.cumsum(daily_counts, axis=1, out=totals[:, 1:])
+    person_days = totals[:, window_days:] - totals[:, :-window_days]
+    peak = _rolling_max(daily_counts, window_days)
+
+    # Whether each employee is off at all in each window, then distinct employees off per group
+    employees_off = sum_by_department(_rolling_max(on_leave, window_days), members, offsets)
+
+    return rows, np.arange(window_count), employees_off, peak, person_days
+
+
+def rolling_absence_frame(leave_matrix, window_days=DEFAULT_WINDOW_DAYS):
+    """Long table of rolling_absence: one row per location, department and window start."""
+    rows, starts, employees_off, peak, person_days = rolling_absence(leave_matrix, window_days)
+    dates = np.asarray(leave_matrix.dates)
+    window_days = max(1, min(window_days, len(dates)))
+    group_index = np.repeat(np.arange(len(rows)), len(starts))
+    window_index = np.tile(starts, len(rows))
+    return pd.DataFrame({
+        'Location': pd.Categorical([rows[i][0] for i in group_index]),
+        'Department': pd.Categorical([rows[i][1] for i in group_index]),
+        'Window_Start': dates[window_index],
+        'Window_End': dates[window_index + window_days - 1],
+        'Headcount': np.array([headcount for _, _, headcount in rows], dtype=np.int64)[group_index],
+        'Employees_Off': employees_off.ravel(),
+        'Peak_Concurrent': peak.ravel(),
+        'Person_Days': person_days.ravel(),
+    })
+
+
+class RollingAbsenceReportGenerator:
+    """Summary of each department's worst rolling window: who is off together, and how many at once."""
+
+    def __init__(self, leave_matrix, window_days=DEFAULT_WINDOW_DAYS):
+        self.matrix = leave_matrix
+        self.window_days = max(1, min(window_days, len(leave_matrix.dates) or window_days))  # No longer than the data
+        self.wb = Workbook()
+        self.header_fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+        self.thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'),
+                                  bottom=Side(style='thin'))
+
+    def _summary_rows(self):
+        """Per location/department, the window with the most distinct employees off (earliest on ties)."""
+        rows, starts, employees_off, peak, person_days = rolling_absence(self.matrix, self.window_days)
+        dates = np.asarray(self.matrix.dates)
+        summary = []
+        if len(starts) == 0:
+            return summary
+        worst = employees_off.argmax(axis=1)
+        for group, (location, department, headcount) in enumerate(rows):
+            window = worst[group]
+            summary.append((location, department, headcount,
+                            pd.Timestamp(dates[window]).date(), pd.Timestamp(dates[window + self.window_days - 1]).date(),
+                            int(employees_off[group, window]), int(peak[group].max()),
+                            int(person_days[group].max())))
+        return sorted(summary, key=lambda row: (-row[5] / row[2], row[0], row[1]))
+
+    def generate_report(self):
+        """Generate the summary sheet."""
+        # Remove default sheet if it exists
+        if 'Sheet' in self.wb.sheetnames:
+            self.wb.remove(self.wb['Sheet'])
+
+        ws = self.wb.create_sheet(f"{self.window_days}-Day Peaks")
+        headers = ['Location', 'Department', 'Employees', 'Worst Window From', 'To', 'Employees Off',
+                   'Share Off', 'Most Off In A Day', 'Most Days Off']
+        for col, header in enumerate(headers, 1):
+            cell = ws.cell(row=1, column=col)
+            cell.value = header
+            cell.font = Font(bold=True)
+            cell.fill = self.header_fill
+            cell.alignment = Alignment(horizontal='center', wrap_text=True)
+            cell.border = self.thin_border
+
+        for row, (location, department, headcount, first, last, off, peak, person_days) in \
+                enumerate(self._summary_rows(), 2):
+            values = [location, department, headcount, first, last, off, off / headcount, peak, person_days]
+            for col, value in enumerate(values, 1):
+                cell = ws.cell(row=row, column=col)
+                cell.value = value
+                cell.border = self.thin_border
+                if col > 2:
+                    cell.alignment = Alignment(horizontal='center')
+            ws.cell(row=row, column=4).number_format = 'dd/mm/yyyy'
+            ws.cell(row=row, column=5).number_format = 'dd/mm/yyyy'
+            ws.cell(row=row, column=7).number_format = '0%'
+            color = ratio_color(off, headcount)
+            if color:
+                ws.cell(row=row, column=7).fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+        for col, width in enumerate([30, 20, 10, 12, 12, 10, 9, 10, 10], 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        ws.freeze_panes = 'A2'
+
+    def save_report(self, directory, saver=None):
+        """Save the summary workbook (through saver, a WorkbookSaver, if given) and the full per-window table."""
+        current_date = datetime.now()
+        month_year = current_date.strftime("%d %b %Y")
+        filename = f"Rolling Absence {self.window_days}-Day {month_year}"
+        (saver or WorkbookSaver()).save(self.wb, os.path.join(directory, f"{filename}.xlsx"))
+        for path in write_table(rolling_absence_frame(self.matrix, self.window_days), directory, filename):
+            print(f"Saved: {os.path.basename(path)}")
+
+
+def generate_rolling_absence_report(leave_matrix, output_directory, window_days=DEFAULT_WINDOW_DAYS,
+                                    saver=None):
+    """Main function to generate and save the rolling-window absence summary and data."""
+    report_generator = RollingAbsenceReportGenerator(leave_matrix, window_days)
+    report_generator.generate_report()
+    report_generator.save_report(output_directory, saver)
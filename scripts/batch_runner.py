@@ -0,0 +1,110 @@
+import contextlib
+import csv
+import glob
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from scripts.file_loader import set_error_popups
+from scripts.report_pipeline import REPORT_DAYS_AFTER, REPORT_DAYS_BEFORE, run_report_pipeline
+
+BATCH_LOG_FILE = 'batch.log'
+
+
+def expand_input_dirs(patterns):
+    """Expand folder paths and glob patterns into a sorted list of unique existing folders."""
+    folders = []
+    for pattern in patterns:
+        matches = glob.glob(pattern) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            folder = os.path.abspath(match)
+            if os.path.isdir(folder) and folder not in folders:
+                folders.append(folder)
+    return sorted(folders)
+
+
+def _folder_labels(folders):
+    """Name each input folder for its output folder, using the parent's name for 'Humanforce Reports'."""
+    labels = {}
+    used = set()
+    for folder in folders:
+        name = os.path.basename(folder)
+        if name.lower() == 'humanforce reports':
+            name = os.path.basename(os.path.dirname(folder)) or name
+        label, suffix = name, 2
+        while label in used:
+            label, suffix = f"{name} ({suffix})", suffix + 1
+        used.add(label)
+        labels[folder] = label
+    return labels
+
+
+def _run_folder(reports_dir, base_dir, horizon, pipeline_options):
+    """Run the pipeline for one folder in a worker process, logging to the folder's batch.log."""
+    set_error_popups(False)
+    os.makedirs(base_dir, exist_ok=True)
+    started = time.perf_counter()
+    result = {'folder': reports_dir, 'output': '', 'error': ''}
+    with open(os.path.join(base_dir, BATCH_LOG_FILE), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            output_dir = run_report_pipeline(reports_dir, base_dir, horizon=horizon, **pipeline_options)
+            if output_dir:
+                result.update(status='ok', output=output_dir)
+            else:
+                result.update(status='failed', error='Exports could not be loaded - see batch.log')
+        except Exception as e:
+            traceback.print_exc()
+            result.update(status='failed', error=f"{type(e).__name__}: {e}")
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def run_batch(patterns, output_root, max_workers=None, horizon=(REPORT_DAYS_BEFORE, REPORT_DAYS_AFTER),
+              **pipeline_options):
+    """Run the pipeline for every input folder in a process pool and write a summary CSV.
+
+    Each folder gets its own output folder (and cache) under output_root, so folders
+    never share state, and a failing folder is recorded without stopping the rest.
+    Other keyword arguments are passed on to run_report_pipeline.
+    Returns the list of per-folder results.
+    """
+    folders = expand_input_dirs(patterns)
+    if not folders:
+        print("Error: No input folders matched.")
+        return []
+
+    labels = _folder_labels(folders)
+    print(f"Running {len(folders)} folders with up to {max_workers or os.cpu_count()} workers...")
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_run_folder, folder, os.path.join(output_root, labels[folder]), horizon,
+                                   pipeline_options): folder
+                   for folder in folders}
+        for future in as_completed(futures):
+            folder = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died, e.g. out of memory
+                result = {'folder': folder, 'status': 'failed', 'seconds': '', 'output': '',
+                          'error': f"{type(e).__name__}: {e}"}
+            result['label'] = labels[folder]
+            results.append(result)
+            print(f"  {result['status']:<6} {labels[folder]} ({result['seconds']}s) {result['error']}")
+
+    results.sort(key=lambda result: result['label'])
+    summary_path = os.path.join(output_root, datetime.now().strftime("Batch Summary %d %b %Y %H%M%S.csv"))
+    os.makedirs(output_root, exist_ok=True)
+    with open(summary_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['label', 'folder', 'status', 'seconds', 'output', 'error'])
+        writer.writeheader()
+        writer.writerows(results)
+
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    print(f"Batch finished in {time.perf_counter() - started:.1f}s: "
+          f"{len(results) - failed} succeeded, {failed} failed. Summary: {os.path.basename(summary_path)}")
+    return results
@@ -0,0 +1,156 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+
+from scripts.leave_rollup import department_daily_absence, ratio_color
+from scripts.sheet_limits import MAX_ROWS, chunk_sizes
+from scripts.workbook_saver import WorkbookSaver
+
+# Thresholds file looked for next to the script when none is given
+COVERAGE_CONFIG_FILE = 'coverage_thresholds.json'
+
+# Share of a department's employees that may be on leave on one day before it is flagged
+DEFAULT_THRESHOLD = 0.25
+
+EXCEPTION_COLUMNS = ['Location', 'Department', 'Date', 'On Leave', 'Employees', 'Ratio', 'Threshold', 'Excess']
+
+
+def load_coverage_thresholds(path=None):
+    """Load the coverage thresholds config, falling back to DEFAULT_THRESHOLD everywhere.
+
+    The file is JSON of the form
+        {"default": 0.25,
+         "departments": {"Nursing": 0.2},
+         "locations": {"MOUNT BARKER": {"Kitchen": 0.5}}}
+    where a location/department entry beats a department entry, which beats the default.
+    """
+    thresholds = {'default': DEFAULT_THRESHOLD, 'departments': {}, 'locations': {}}
+    if not path or not os.path.exists(path):
+        if path:
+            print(f"No coverage thresholds at {path} - using {DEFAULT_THRESHOLD:.0%} for every department")
+        return thresholds
+    try:
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        thresholds['default'] = float(config.get('default', DEFAULT_THRESHOLD))
+        thresholds['departments'] = {str(dept): float(value)
+                                     for dept, value in config.get('departments', {}).items()}
+        thresholds['locations'] = {str(location): {str(dept): float(value) for dept, value in depts.items()}
+                                   for location, depts in config.get('locations', {}).items()}
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        print(f"Error reading coverage thresholds {path}: {e} - using {DEFAULT_THRESHOLD:.0%} for every department")
+        return {'default': DEFAULT_THRESHOLD, 'departments': {}, 'locations': {}}
+    return thresholds
+
+
+def _group_thresholds(rows, thresholds):
+    return np.array([thresholds['locations'].get(location, {}).get(
+        department, thresholds['departments'].get(department, thresholds['default']))
+        for location, department, _ in rows], dtype=np.float64)
+
+
+def find_coverage_exceptions(leave_matrix, thresholds=None):
+    """Every location/department/date where the share of employees on leave is over its threshold.
+
+    The daily counts for the whole location x department x date grid are summed over each
+    department's member rows of the leave matrix with one np.add.reduceat, and the ratios
+    are compared against the thresholds in one go, so the cost doesn't depend on how many
+    cells end up flagged. Rows are sorted by how far the ratio is over the threshold,
+    worst first.
+    """
+    thresholds = thresholds or load_coverage_thresholds()
+    rows, daily_counts = department_daily_absence(leave_matrix)
+    if not rows or daily_counts.shape[1] == 0:
+        return pd.DataFrame(columns=EXCEPTION_COLUMNS)
+
+    headcount = np.array([count for _, _, count in rows], dtype=np.float64)
+    limits = _group_thresholds(rows, thresholds)
+    ratio = daily_counts / headcount[:, None]
+    group_index, date_index = np.nonzero(ratio > limits[:, None])
+
+    locations = np.array([location for location, _, _ in rows], dtype=object)
+    departments = np.array([department for _, department, _ in rows], dtype=object)
+    exceptions = pd.DataFrame({
+        'Location': locations[group_index],
+        'Department': departments[group_index],
+        'Date': np.asarray(leave_matrix.dates)[date_index],
+        'On Leave': daily_counts[group_index, date_index],
+        'Employees': headcount[group_index].astype(np.int64),
+        'Ratio': ratio[group_index, date_index].round(3),
+        'Threshold': limits[group_index],
+    })
+    exceptions['Excess'] = (exceptions['Ratio'] - exceptions['Threshold']).round(3)
+    return exceptions.sort_values(['Excess', 'Date', 'Location', 'Department'],
+                                  ascending=[False, True, True, True], ignore_index=True)
+
+
+class CoverageReportGenerator:
+    """Compact workbook of understaffed days: one row per location, department and date over threshold."""
+
+    def __init__(self, exceptions):
+        self.exceptions = exceptions
+        self.wb = Workbook()
+        self.header_fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+        self.thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'),
+                                  bottom=Side(style='thin'))
+
+    def _generate_worksheet(self, ws_name, exceptions):
+        ws = self.wb.create_sheet(ws_name)
+        for col, header in enumerate(EXCEPTION_COLUMNS, 1):
+            cell = ws.cell(row=1, column=col)
+            cell.value = header
+            cell.font = Font(bold=True)
+            cell.fill = self.header_fill
+            cell.alignment = Alignment(horizontal='center')
+            cell.border = self.thin_border
+
+        for row, values in enumerate(exceptions.itertuples(index=False), 2):
+            location, department, date, on_leave, employees, ratio, threshold, excess = values
+            ws.append([location, department, pd.Timestamp(date).to_pydatetime().date(), int(on_leave),
+                       int(employees), float(ratio), float(threshold), float(excess)])
+            ws.cell(row=row, column=3).number_format = 'ddd dd/mm/yyyy'
+            for col in (6, 7, 8):
+                ws.cell(row=row, column=col).number_format = '0%'
+            color = ratio_color(ratio, 1)
+            if color:
+                ws.cell(row=row, column=6).fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+        for col, width in enumerate([30, 20, 16, 10, 11, 9, 11, 9], 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        ws.freeze_panes = 'A2'
+        ws.auto_filter.ref = f"A1:{get_column_letter(len(EXCEPTION_COLUMNS))}{max(ws.max_row, 1)}"
+
+    def generate_report(self):
+        """Generate the exceptions sheet, split over several if it outgrows Excel's row limit."""
+        # Remove default sheet if it exists
+        if 'Sheet' in self.wb.sheetnames:
+            self.wb.remove(self.wb['Sheet'])
+
+        chunks = chunk_sizes(len(self.exceptions), MAX_ROWS - 1)
+        for number, (start, stop) in enumerate(chunks, 1):
+            ws_name = 'Exceptions' if len(chunks) == 1 else f"Exceptions ({number})"
+            self._generate_worksheet(ws_name, self.exceptions.iloc[start:stop])
+
+    def save_report(self, directory, saver=None):
+        """Save the workbook (through saver, a WorkbookSaver, if given) and a CSV of the same exceptions."""
+        current_date = datetime.now()
+        month_year = current_date.strftime("%d %b %Y")
+        filename = f"Coverage Exceptions {month_year}"
+        (saver or WorkbookSaver()).save(self.wb, os.path.join(directory, f"{filename}.xlsx"))
+        self.exceptions.to_csv(os.path.join(directory, f"{filename}.csv"), index=False)
+        print(f"Saved: {filename}.csv")
+
+
+def generate_coverage_report(leave_matrix, output_directory, thresholds_path=None, saver=None):
+    """Main function to find understaffed days and save them as a workbook and CSV."""
+    exceptions = find_coverage_exceptions(leave_matrix, load_coverage_thresholds(thresholds_path))
+    print(f"Coverage exceptions: {len(exceptions)} understaffed department days")
+    report_generator = CoverageReportGenerator(exceptions)
+    report_generator.generate_report()
+    report_generator.save_report(output_directory, saver)
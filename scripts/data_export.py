@@ -0,0 +1,93 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def _categorical(codes, categories):
+    return pd.Categorical.from_codes(np.asarray(codes), categories=[str(value) for value in categories])
+
+
+def leave_long_frame(leave_matrix):
+    """One row per employee, leave date and work area, built straight from the matrix arrays."""
+    m = leave_matrix
+    status_codes = np.asarray(m.status_codes)
+    emp_rows, date_columns = np.nonzero(status_codes)
+
+    # Repeat every leave day once per work area of the employee
+    area_employee = np.asarray(m.area_employee)
+    area_order = np.argsort(area_employee, kind='stable')
+    areas_per_employee = np.bincount(area_employee, minlength=len(m.emp_codes))
+    first_area = np.concatenate(([0], np.cumsum(areas_per_employee)[:-1]))
+    repeats = areas_per_employee[emp_rows]
+    leave_index = np.repeat(np.arange(len(emp_rows)), repeats)
+    offsets = np.arange(len(leave_index)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    areas = area_order[first_area[emp_rows[leave_index]] + offsets]
+    emp_rows, date_columns = emp_rows[leave_index], date_columns[leave_index]
+
+    return pd.DataFrame({
+        'Employee_Code': _categorical(emp_rows, m.emp_codes),
+        'Employee_Name': pd.Categorical(np.asarray(m.names)[emp_rows]),
+        'Employment_Type_Name': _categorical(np.asarray(m.employment_type_codes)[emp_rows], m.employment_types),
+        'Location': _categorical(np.asarray(m.area_location)[areas], m.locations),
+        'Department': _categorical(np.asarray(m.area_department)[areas], m.departments),
+        'Role': _categorical(np.asarray(m.area_role)[areas], m.roles),
+        'Date': np.asarray(m.dates)[date_columns],
+        'Status': _categorical(status_codes[emp_rows, date_columns] - 1, m.statuses),
+    })
+
+
+def department_count_frame(leave_matrix, long_frame=None):
+    """Employees on leave per date, location and department, with the department headcount."""
+    m = leave_matrix
+    if long_frame is None:
+        long_frame = leave_long_frame(m)
+
+    # An employee with several roles in one department is only counted once
+    on_leave = (long_frame[['Location', 'Department', 'Date', 'Employee_Code']]
+                .drop_duplicates()
+                .groupby(['Location', 'Department', 'Date'], observed=True)
+                .size()
+                .rename('On_Leave')
+                .reset_index())
+
+    headcount = (pd.DataFrame({
+        'Location': _categorical(m.area_location, m.locations),
+        'Department': _categorical(m.area_department, m.departments),
+        'Employee': np.asarray(m.area_employee),
+    }).drop_duplicates()
+      .groupby(['Location', 'Department'], observed=True)
+      .size()
+      .rename('Headcount')
+      .reset_index())
+
+    return on_leave.merge(headcount, on=['Location', 'Department'], how='left')
+
+
+def write_table(df, directory, base_name):
+    """Write df as CSV and, when a Parquet engine is installed, as Parquet."""
+    written = []
+    csv_path = os.path.join(directory, f"{base_name}.csv")
+    df.to_csv(csv_path, index=False)
+    written.append(csv_path)
+    try:
+        parquet_path = os.path.join(directory, f"{base_name}.parquet")
+        df.to_parquet(parquet_path, index=False)
+        written.append(parquet_path)
+    except ImportError:
+        print(f"Skipped {base_name}.parquet - install pyarrow to write Parquet files")
+    return written
+
+
+def export_leave_data(leave_matrix, output_directory):
+    """Write the long-format leave table and the per-date department counts for BI tools."""
+    current_date = datetime.now()
+    month_year = current_date.strftime("%d %b %Y")
+    long_frame = leave_long_frame(leave_matrix)
+    written = write_table(long_frame, output_directory, f"Leave Data {month_year}")
+    written += write_table(department_count_frame(leave_matrix, long_frame), output_directory,
+                            f"Department Leave Counts {month_year}")
+    for path in written:
+        print(f"Saved: {os.path.basename(path)}")
+    return written
@@ -1,18 +1,35 @@
 import os
+from bisect import bisect_left, bisect_right
 from datetime import datetime
+from itertools import accumulate
 
-from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+
+from scripts.employee_manager import leave_days_covered
+from scripts.location_groups import LocationIndex, load_location_groups
+from scripts.sheet_limits import INDEX_SHEET_NAME, SheetNamer, add_index_sheet, plan_date_shards, plan_row_shards
+from scripts.sheet_stream import StreamingWorkbook, empty_cell, string_cell
+from scripts.workbook_saver import WorkbookSaver
 
 
 class DepartmentalLeaveReportGenerator:
-    def __init__(self, employees, employee_manager):
+    def __init__(self, employees, employee_manager, cell_budget=None, location_groups=None, streaming=False):
         self.employees = {code: emp for code, emp in employees.items() if len(emp.leave_dates) > 0}
-        self.wb = Workbook()
+        self.wb = StreamingWorkbook()
+        # Write the GLOBAL block rows straight into the saved sheet XML instead of as cells
+        self.streaming = streaming
         self.ws = None
-        self.status_colors = employee_manager.leave_status_manager.status_colors
-        self.COMBINED_LOCATIONS = [("ADELAIDE HILLS & STRATHALBYN", ["ADELAIDE HILLS", "STRATHALBYN"]), ]
+        status_manager = employee_manager.leave_status_manager
+        self.status_colors = status_manager.status_colors
+        # Indexed by status code, so cells never look a status up by name
+        self.status_fills = [PatternFill(start_color=color, end_color=color, fill_type='solid') if color else None
+                             for color in status_manager.code_colors]
+        # (group name, locations) pairs, each getting a combined sheet
+        self.location_groups = load_location_groups() if location_groups is None else location_groups
+        self.location_index = LocationIndex(self.employees)
+        self.cell_budget = cell_budget  # Most cells per sheet before the dates are split, None for Excel's limits
 
         # Define styles
         self.thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'),
@@ -24,8 +41,12 @@ class DepartmentalLeaveReportGenerator:
         self.header_fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
         self.total_fill = PatternFill(start_color='E6E6E6', end_color='E6E6E6', fill_type='solid')
 
-    def _generate_worksheet(self, ws_name, location_employees, all_dates):
-        """Generate a worksheet for the given location."""
+    def _generate_worksheet(self, ws_name, blocks, all_dates, streamed=False):
+        """Generate a worksheet of name stacks per date for each (block name, employees) block.
+
+        Location sheets have a block per department and the GLOBAL sheet a block per location.
+        With streamed the block rows are written straight into the saved sheet XML.
+        """
         ws = self.wb.create_sheet(ws_name)
 
         # Write date headers only once at the top
@@ -45,49 +66,50 @@ class DepartmentalLeaveReportGenerator:
             cell.alignment = Alignment(horizontal='center')
             cell.border = self.thick_border
 
-        # Move to next row for department data
-        current_row += 1
+        # Write the blocks below the headers
+        if streamed:
+            self._stream_blocks(ws, current_row + 1, blocks, all_dates)
+        else:
+            self._write_blocks(ws, current_row + 1, blocks, all_dates)
 
-        # Get departments and their employees
-        dept_employees = self._get_location_departments(location_employees)
+        # Adjust column widths
+        for col in range(1, len(all_dates) + 2):
+            ws.column_dimensions[get_column_letter(col)].width = 12
 
-        # Create a thicker border for department tables
-        department_border = Border(
-            left=Side(style='medium'),
-            right=Side(style='medium'),
-            top=Side(style='medium'),
-            bottom=Side(style='medium')
-        )
+        # Freeze panes - freeze top row and first column
+        ws.freeze_panes = 'B2'
 
+    def _write_blocks(self, ws, current_row, blocks, all_dates):
+        """Write each block's name stacks and totals from current_row, a spacing row between blocks."""
         # Create a border with only the right side for internal cells
         right_border = Border(right=Side(style='thin'))
 
-        # Process each department
-        first_department = True
-        for dept_name, dept_emps in dept_employees.items():
-            if not first_department:
-                current_row += 1  # Add more spacing between departments
-            first_department = False
+        # Process each block
+        first_block = True
+        for block_name, block_emps in blocks:
+            if not first_block:
+                current_row += 1  # Add more spacing between blocks
+            first_block = False
 
             max_employees_per_day = 0
             employees_by_date = {}
 
             # Pre-calculate employees for each date and find maximum
             for date in all_dates:
-                emps_on_leave = self._get_employees_by_date(dept_emps, date)
+                emps_on_leave = self._get_employees_by_date(block_emps, date)
                 employees_by_date[date] = emps_on_leave
                 max_employees_per_day = max(max_employees_per_day, len(emps_on_leave))
 
-            # Write department name only if there are employees
+            # Write block name only if there are employees
             if max_employees_per_day > 0:
-                # Store starting positions for the department table
+                # Store starting positions for the block table
                 table_start_row = current_row
                 table_start_col = 1
                 table_end_col = len(all_dates) + 1
 
-                # Write department name
+                # Write block name
                 cell = ws.cell(row=current_row, column=1)
-                cell.value = dept_name
+                cell.value = block_name
                 cell.font = Font(bold=True)
                 cell.fill = self.header_fill
                 cell.alignment = Alignment(vertical='center', wrap_text=True)
@@ -100,10 +122,9 @@ class DepartmentalLeaveReportGenerator:
 
                         emps_on_leave = employees_by_date[date]
                         if row_offset < len(emps_on_leave):
-                            emp, status = emps_on_leave[row_offset]
+                            emp, status_code = emps_on_leave[row_offset]
                             cell.value = self._format_employee_name(emp.name)
-                            cell.fill = PatternFill(start_color=self.status_colors[status],
-                                                    end_color=self.status_colors[status], fill_type='solid')
+                            cell.fill = self.status_fills[status_code]
                             cell.alignment = Alignment(horizontal='center')
 
                         # Add right border for all cells except the last column
@@ -121,7 +142,7 @@ class DepartmentalLeaveReportGenerator:
 
                 # Calculate and write totals for each date
                 for col, date in enumerate(all_dates, start=2):
-                    count = self._count_unique_employees_on_date(dept_emps, date)
+                    count = self._count_unique_employees_on_date(block_emps, date)
                     cell = ws.cell(row=total_row, column=col)
                     cell.value = count if count > 0 else ''
                     cell.font = Font(bold=True)
@@ -131,11 +152,11 @@ class DepartmentalLeaveReportGenerator:
                     if col < table_end_col:
                         cell.border = right_border
 
-                # Merge department name cells
+                # Merge block name cells
                 ws.merge_cells(start_row=start_row, start_column=1,
                                end_row=total_row, end_column=1)
 
-                # Apply thick border around the entire department table
+                # Apply thick border around the entire block table
                 for row in range(table_start_row, total_row + 1):
                     # Left border of first column
                     ws.cell(row=row, column=table_start_col).border = Border(
@@ -168,204 +189,217 @@ class DepartmentalLeaveReportGenerator:
 
                 current_row += 1  # Move to next row after totals
 
-        # Adjust column widths
-        for col in range(1, len(all_dates) + 2):
-            ws.column_dimensions[get_column_letter(col)].width = 12
-
-        # Freeze panes - freeze top row and first column
-        ws.freeze_panes = 'B2'
-
-    def generate_report(self):
-        """Generate the departmental leave report in Excel format."""
-        # Get all unique dates
-        all_dates = self._get_all_leave_dates()
-
-        # Remove default sheet if it exists
-        if 'Sheet' in self.wb.sheetnames:
-            self.wb.remove(self.wb['Sheet'])
-
-        # Generate GLOBAL worksheet first
-        self._generate_global_worksheet(all_dates)
-
-        # Generate location-specific worksheets
+    def _stream_blocks(self, ws, current_row, blocks, all_dates):
+        """Stream the same rows as _write_blocks into ws as XML, a template per cell style and status."""
+        wb = self.wb
+        ordinals = [date.toordinal() for date in all_dates]
+        last_date = len(all_dates) - 1
+
+        # Name stacks per date of each block with anyone on leave, as (shared string, status code) pairs
+        placed = []
+        first_block = True
+        for block_name, block_emps in blocks:
+            if not first_block:
+                current_row += 1  # Add more spacing between blocks
+            first_block = False
+
+            stacks = [[] for _ in all_dates]
+            for emp in block_emps:
+                name = wb.shared_strings.add(self._format_employee_name(emp.name))
+                for range_start, range_end, status_code in emp.leave_dates.code_ranges():
+                    for day in range(bisect_left(ordinals, range_start), bisect_right(ordinals, range_end)):
+                        stacks[day].append((name, status_code))
+            max_employees_per_day = max(map(len, stacks), default=0)
+            if max_employees_per_day > 0:
+                placed.append((current_row, block_name, stacks, max_employees_per_day))
+                # Merge the block name cells down to the totals row
+                ws.merged_cells.add(CellRange(f"A{current_row}:A{current_row + max_employees_per_day}"))
+                current_row += max_employees_per_day + 1
+        if not placed:
+            return
+
+        def edge_borders(top, bottom):
+            """Borders of a block row's first column, inner date columns and last column."""
+            edge_top = Side(style='medium') if top else None
+            edge_bottom = Side(style='medium') if bottom else None
+            inner = Border(top=edge_top, bottom=edge_bottom, right=Side(style='thin'))
+            return (Border(left=Side(style='medium'), right=Side(style='thin'), top=edge_top, bottom=edge_bottom),
+                    (inner, Border(left=Side(style='thin'), right=Side(style='medium'), top=edge_top,
+                                   bottom=edge_bottom)))
+
+        center = Alignment(horizontal='center')
+        name_styles, blank_cells = [], []
+        for top in (True, False):
+            _, date_borders = edge_borders(top, False)
+            name_styles.append([[wb.style_id(fill=fill, border=border, alignment=center) for fill in self.status_fills]
+                                for border in date_borders])
+            blank_cells.append([empty_cell(wb.style_id(border=border)) for border in date_borders])
+        block_border, _ = edge_borders(True, False)
+        block_style = wb.style_id(font=Font(bold=True), fill=self.header_fill, border=block_border,
+                                  alignment=Alignment(vertical='center', wrap_text=True))
+        merged_cell = empty_cell(wb.style_id(border=edge_borders(False, False)[0]))
+        total_border, total_date_borders = edge_borders(False, True)
+        total_first_cell = empty_cell(wb.style_id(border=total_border))
+        total_styles = [wb.style_id(font=Font(bold=True), fill=self.total_fill, border=border, alignment=center)
+                        for border in total_date_borders]
+
+        def rows():
+            for start_row, block_name, stacks, max_employees_per_day in placed:
+                for row_offset in range(max_employees_per_day):
+                    styles, blanks = name_styles[row_offset > 0], blank_cells[row_offset > 0]
+                    cells = [wb.cell_xml(block_style, block_name) if row_offset == 0 else merged_cell]
+                    for day, stack in enumerate(stacks):
+                        last = day == last_date
+                        if row_offset < len(stack):
+                            name, status_code = stack[row_offset]
+                            cells.append(string_cell(styles[last][status_code], name))
+                        else:
+                            cells.append(blanks[last])
+                    yield start_row + row_offset, ''.join(cells)
+
+                # Totals row
+                yield start_row + max_employees_per_day, total_first_cell + ''.join(
+                    wb.cell_xml(total_styles[day == last_date], len(stack) or None) for day, stack in enumerate(stacks))
+
+        wb.stream_rows(ws, placed[0][0], current_row - 1, len(all_dates) + 1, rows())
+
+    def _get_sheet_targets(self):
+        """Get (sheet name, location employees) for every sheet of the report, in order.
+
+        The GLOBAL sheet has no employee filter (None) as it is laid out by location.
+        """
+        namer = SheetNamer(reserved=(INDEX_SHEET_NAME,))
+        targets = [(namer.name('GLOBAL'), None)]
+
+        # Location-specific worksheets
         locations = self._get_all_locations()
         for location in locations:
             filtered_employees = self._get_employees_for_location(location)
             if filtered_employees:  # Only create sheet if there are employees
-                safe_name = str(location)[:31]  # Excel worksheet names limited to 31 chars
-                self._generate_worksheet(safe_name, filtered_employees, all_dates)
+                targets.append((namer.name(location), filtered_employees))
 
-        # Generate combined location worksheets
-        for combined_name, location_list in self.COMBINED_LOCATIONS:
-            filtered_employees = self._get_employees_for_location((combined_name, location_list))
+        # Combined location worksheets
+        for group_name, group_locations in self.location_groups:
+            filtered_employees = self._get_employees_for_location((group_name, group_locations))
             if filtered_employees:
-                safe_name = combined_name[:31]
-                self._generate_worksheet(safe_name, filtered_employees, all_dates)
+                targets.append((namer.name(group_name), filtered_employees))
 
-    def _generate_global_worksheet(self, all_dates):
-        """Generate a global worksheet showing all locations."""
-        ws = self.wb.create_sheet("GLOBAL")
+        return targets
 
-        # Write date headers only once at the top
-        current_row = 1
-
-        # Empty cell in top-left corner
-        cell = ws.cell(row=current_row, column=1)
-        cell.fill = self.header_fill
-        cell.border = self.thick_border
-
-        # Write date headers
-        for col, date in enumerate(all_dates, start=2):
-            cell = ws.cell(row=current_row, column=col)
-            cell.value = self._format_date_header(date)
-            cell.font = Font(bold=True)
-            cell.fill = self.header_fill
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = self.thick_border
-
-        # Move to next row for location data
-        current_row += 1
-
-        locations = self._get_all_locations()
-        first_location = True
-
-        # Create a border with only the right side for internal cells
-        right_border = Border(right=Side(style='thin'))
-
-        for location in locations:
-            if not first_location:
-                current_row += 1  # Add more spacing between locations
-            first_location = False
+    def get_sheet_names(self):
+        """Get the names of the sheets generate_report creates."""
+        return [name for name, _ in self._get_sheet_targets()]
 
+    def _get_blocks(self, location_employees):
+        """Get the (block name, employees) blocks of a sheet - locations for GLOBAL, else departments."""
+        if location_employees is not None:
+            return list(self._get_location_departments(location_employees).items())
+        blocks = []
+        for location in self._get_all_locations():
             filtered_employees = self._get_employees_for_location(location)
-            if not filtered_employees:
-                continue
-
-            # Pre-calculate employees for each date and find maximum
-            employees_by_date = {}
-            max_employees_per_day = 0
-
-            sorted_employees = sorted(filtered_employees.values(), key=lambda x: (-len(x.leave_dates), x.name))
-            for date in all_dates:
-                emps_on_leave = self._get_employees_by_date(sorted_employees, date)
-                employees_by_date[date] = emps_on_leave
-                max_employees_per_day = max(max_employees_per_day, len(emps_on_leave))
-
-            if max_employees_per_day > 0:
-                # Store starting positions for the location table
-                table_start_row = current_row
-                table_start_col = 1
-                table_end_col = len(all_dates) + 1
-
-                # Write location name
-                cell = ws.cell(row=current_row, column=1)
-                cell.value = location
-                cell.font = Font(bold=True)
-                cell.fill = self.header_fill
-                cell.alignment = Alignment(vertical='center', wrap_text=True)
-
-                start_row = current_row  # Start merging from the first employee row
-
-                # Write employee names
-                for row_offset in range(max_employees_per_day):
-                    for col, date in enumerate(all_dates, start=2):
-                        cell = ws.cell(row=current_row + row_offset, column=col)
-
-                        emps_on_leave = employees_by_date[date]
-                        if row_offset < len(emps_on_leave):
-                            emp, status = emps_on_leave[row_offset]
-                            cell.value = self._format_employee_name(emp.name)
-                            cell.fill = PatternFill(start_color=self.status_colors[status],
-                                                    end_color=self.status_colors[status], fill_type='solid')
-                            cell.alignment = Alignment(horizontal='center')
-
-                        # Add right border for all cells except the last column
-                        if col < table_end_col:
-                            cell.border = right_border
-
-                current_row += max_employees_per_day
-
-                # Add totals row (without borders)
-                total_row = current_row
-
-                # Write empty cell with total formatting
-                cell = ws.cell(row=total_row, column=1)
-                cell.fill = self.total_fill
-
-                # Calculate and write totals for each date
-                for col, date in enumerate(all_dates, start=2):
-                    count = self._count_unique_employees_on_date(sorted_employees, date)
-                    cell = ws.cell(row=total_row, column=col)
-                    cell.value = count if count > 0 else ''
-                    cell.font = Font(bold=True)
-                    cell.fill = self.total_fill
-                    cell.alignment = Alignment(horizontal='center')
-                    # Add right border for all cells except the last column
-                    if col < table_end_col:
-                        cell.border = right_border
-
-                # Merge location name cells
-                ws.merge_cells(start_row=start_row, start_column=1,
-                               end_row=total_row, end_column=1)
+            if filtered_employees:
+                blocks.append((location, sorted(filtered_employees.values(),
+                                                key=lambda x: (-len(x.leave_dates), x.name))))
+        return blocks
+
+    def _get_block_heights(self, blocks, all_dates):
+        """Rows each block takes: its busiest day's name stack plus the totals row (0 if nobody is off).
+
+        Counted from each employee's leave ranges with a running sum over the dates, without
+        expanding the stacks themselves.
+        """
+        ordinals = [date.toordinal() for date in all_dates]
+        heights = []
+        for _, block_emps in blocks:
+            changes = [0] * (len(ordinals) + 1)
+            for emp in block_emps:
+                for range_start, range_end, _ in emp.leave_dates.ordinal_ranges():
+                    changes[bisect_left(ordinals, range_start)] += 1
+                    changes[bisect_right(ordinals, range_end)] -= 1
+            busiest = max(accumulate(changes[:-1]), default=0)
+            heights.append(busiest + 1 if busiest else 0)
+        return heights
+
+    def _plan_sheets(self, targets, all_dates):
+        """Split each target sheet into parts that fit Excel's row and column limits and the cell budget.
+
+        Whole blocks move between parts, so a block is never cut across sheets by rows.
+        Returns (sheet name, source sheet name, blocks, dates, rows) per sheet to create.
+        """
+        split = []
+        for sheet_name, location_employees in targets:
+            blocks = self._get_blocks(location_employees)
+            heights = [height + 1 for height in self._get_block_heights(blocks, all_dates)]  # With spacing row
+
+            parts = []
+            for block_start, block_stop in plan_row_shards(heights, 1):
+                rows = sum(heights[block_start:block_stop])
+                for date_start, date_stop in plan_date_shards(len(all_dates), 1, rows + 1, self.cell_budget):
+                    parts.append((blocks[block_start:block_stop], all_dates[date_start:date_stop], rows))
+            split.append((sheet_name, parts))
+
+        # A split sheet's own name goes unused, so only the unsplit names are kept from its parts
+        namer = SheetNamer(reserved=[INDEX_SHEET_NAME] +
+                           [sheet_name for sheet_name, parts in split if len(parts) == 1])
+        plan = []
+        for sheet_name, parts in split:
+            names = [sheet_name] if len(parts) == 1 else namer.part_names(sheet_name, len(parts))
+            for name, (part_blocks, dates, rows) in zip(names, parts):
+                plan.append((name, sheet_name, part_blocks, dates, rows))
+        return plan
+
+    def _generate_sheets(self, plan, targets):
+        """Create the planned sheets, with an index first if any sheet was split."""
+        location_employees = dict(targets)
+        for name, source_name, blocks, dates, _ in plan:
+            # GLOBAL (no location filter) is the sheet big enough to stream
+            self._generate_worksheet(name, blocks, dates,
+                                     streamed=self.streaming and location_employees[source_name] is None)
+
+        if len(plan) > len(targets):
+            add_index_sheet(self.wb, [(name, source_name, dates[0] if dates else None,
+                                       dates[-1] if dates else None, rows)
+                                      for name, source_name, _, dates, rows in plan])
 
-                # Apply thick border around the entire location table
-                for row in range(table_start_row, total_row + 1):
-                    # Left border of first column
-                    ws.cell(row=row, column=table_start_col).border = Border(
-                        left=Side(style='medium'),
-                        right=Side(style='thin'),
-                        top=Side(style='medium') if row == table_start_row else None,
-                        bottom=Side(style='medium') if row == total_row else None
-                    )
-                    # Right border of last column
-                    ws.cell(row=row, column=table_end_col).border = Border(
-                        left=Side(style='thin'),
-                        right=Side(style='medium'),
-                        top=Side(style='medium') if row == table_start_row else None,
-                        bottom=Side(style='medium') if row == total_row else None
-                    )
-                    # Top border for first row
-                    if row == table_start_row:
-                        for col in range(table_start_col + 1, table_end_col):
-                            ws.cell(row=row, column=col).border = Border(
-                                top=Side(style='medium'),
-                                right=Side(style='thin')
-                            )
-                    # Bottom border for last row
-                    elif row == total_row:
-                        for col in range(table_start_col + 1, table_end_col):
-                            ws.cell(row=row, column=col).border = Border(
-                                bottom=Side(style='medium'),
-                                right=Side(style='thin')
-                            )
+    def generate_report(self):
+        """Generate the departmental leave report in Excel format."""
+        # Get all unique dates
+        all_dates = self._get_all_leave_dates()
 
-                current_row += 1
+        # Remove default sheet if it exists
+        if 'Sheet' in self.wb.sheetnames:
+            self.wb.remove(self.wb['Sheet'])
 
-        # Adjust column widths
-        for col in range(1, len(all_dates) + 2):
-            ws.column_dimensions[get_column_letter(col)].width = 12
+        targets = self._get_sheet_targets()
+        self._generate_sheets(self._plan_sheets(targets, all_dates), targets)
 
-        # Freeze panes - freeze top row and first column
-        ws.freeze_panes = 'B2'
+    def generate_sheet(self, sheet_name):
+        """Generate just one sheet of the report. Returns the names of the sheets created for it, if any."""
+        targets = [target for target in self._get_sheet_targets() if target[0] == sheet_name]
+        if not targets:
+            return []
+        if 'Sheet' in self.wb.sheetnames:
+            self.wb.remove(self.wb['Sheet'])
+        plan = self._plan_sheets(targets, self._get_all_leave_dates())
+        self._generate_sheets(plan, targets)
+        return [name for name, *_ in plan]
 
     def _count_unique_employees_on_date(self, employees, date):
         """Count unique employees on leave for a given date."""
         return len({emp.emp_code for emp in employees if date in emp.leave_dates})
 
     def _get_employees_by_date(self, employees, date):
-        """Get employees who have leave on a specific date, with their status."""
+        """Get employees who have leave on a specific date, with their status code."""
         result = []
         for emp in employees:
-            if date in emp.leave_dates:
-                result.append((emp, emp.leave_dates[date].status))
+            status_code = emp.leave_dates.code_on(date)
+            if status_code:
+                result.append((emp, status_code))
         return result  # Add this return statement
 
     def _get_all_leave_dates(self):
         """Collect all unique leave dates from all employees."""
-        all_dates = set()
-        for employee in self.employees.values():
-            all_dates.update(employee.leave_dates.keys())
-        return sorted(list(all_dates))
+        return leave_days_covered(employee.leave_dates for employee in self.employees.values())
 
     def _format_date_header(self, date):
         """Format date as 'Mon 25/11'."""
@@ -413,37 +447,26 @@ class DepartmentalLeaveReportGenerator:
         return dict(sorted(dept_employees.items()))
 
     def _get_employees_for_location(self, location):
-        """Get employees for a specific location or combined locations."""
-        if isinstance(location, tuple):
-            # Handle combined locations
-            combined_name, location_list = location
-            return {code: emp for code, emp in self.employees.items() if
-                    any(area.location in location_list for area in emp.work_areas)}
-        else:
-            # Handle single location
-            return {code: emp for code, emp in self.employees.items() if
-                    any(area.location == location for area in emp.work_areas)}
+        """Get employees for a specific location or a (group name, locations) group."""
+        return {code: self.employees[code] for code in self.location_index.employee_codes(location)}
 
     def _get_all_locations(self):
-        """Get all unique locations including combined ones."""
-        locations = set()
-        for employee in self.employees.values():
-            for work_area in employee.work_areas:
-                locations.add(work_area.location)
-        return sorted(list(locations))
-
-    def save_report(self, directory):
-        """Save the report with the specified naming convention."""
+        """Get all unique locations of the employees on leave."""
+        return self.location_index.locations()
+
+    def save_report(self, directory, saver=None):
+        """Save the report with the specified naming convention, through saver (a WorkbookSaver) if given."""
         current_date = datetime.now()
         month_year = current_date.strftime("%d %b %Y")
         filename = f"Departmental Leave Report {month_year}.xlsx"
         filepath = os.path.join(directory, filename)
-        self.wb.save(filepath)
-        print(f"Saved: {os.path.basename(filename)}")
+        (saver or WorkbookSaver()).save(self.wb, filepath)
 
 
-def generate_departmental_leave_report(employees, output_directory, employee_manager):
+def generate_departmental_leave_report(employees, output_directory, employee_manager, cell_budget=None,
+                                       location_groups=None, saver=None):
     """Main function to generate and save the departmental leave report."""
-    report_generator = DepartmentalLeaveReportGenerator(employees, employee_manager)
+    report_generator = DepartmentalLeaveReportGenerator(employees, employee_manager, cell_budget, location_groups,
+                                                        streaming=True)
     report_generator.generate_report()
-    report_generator.save_report(output_directory)
+    report_generator.save_report(output_directory, saver)
@@ -1,19 +1,41 @@
 import os
 from datetime import datetime
 
-from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
+from scripts.employee_manager import leave_days_covered
+from scripts.leave_matrix import LeaveMatrix
+from scripts.leave_rollup import ratio_color
+from scripts.leave_summary import SUMMARY_SHEET_NAME, LeaveSummary, add_summary_sheet
+from scripts.location_groups import LocationIndex, load_location_groups
+from scripts.sheet_limits import (MAX_ROWS, INDEX_SHEET_NAME, SheetNamer, add_index_sheet, chunk_sizes,
+                                  plan_date_shards)
+from scripts.sheet_stream import StreamingWorkbook
+from scripts.workbook_saver import WorkbookSaver
+
 
 class LeaveReportGenerator:
-    def __init__(self, employees, employee_manager):
+    def __init__(self, employees, employee_manager, cell_budget=None, location_groups=None, leave_matrix=None,
+                 streaming=False):
         self.employees = {code: emp for code, emp in employees.items() if len(emp.leave_dates) > 0}
         self.employee_manager = employee_manager  # Store the complete employee_manager
-        self.wb = Workbook()
+        self.wb = StreamingWorkbook()
+        # Write the GLOBAL employee rows straight into the saved sheet XML instead of as cells
+        self.streaming = streaming
         self.ws = None
-        self.status_colors = employee_manager.leave_status_manager.status_colors
-        self.COMBINED_LOCATIONS = [("ADELAIDE HILLS & STRATHALBYN", ["ADELAIDE HILLS", "STRATHALBYN"]), ]
+        status_manager = employee_manager.leave_status_manager
+        self.status_colors = status_manager.status_colors
+        # Indexed by status code, so cells never look a status up by name
+        self.status_fills = [PatternFill(start_color=color, end_color=color, fill_type='solid') if color else None
+                             for color in status_manager.code_colors]
+        self.status_initials = status_manager.code_initials
+        # (group name, locations) pairs, each getting a combined sheet
+        self.location_groups = load_location_groups() if location_groups is None else location_groups
+        self.location_index = LocationIndex(self.employees)
+        self.all_location_index = LocationIndex(employee_manager.employees)  # Department headcounts use everyone
+        self.cell_budget = cell_budget  # Most cells per sheet before the dates are split, None for Excel's limits
+        self.leave_matrix = leave_matrix  # Source of the summary sheet, built from employee_manager if None
 
         # Define border styles
         self.thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'),
@@ -24,71 +46,28 @@ class LeaveReportGenerator:
 
     def _get_all_leave_dates(self):
         """Collect all unique leave dates from all employees."""
-        all_dates = set()
-        for employee in self.employees.values():
-            all_dates.update(employee.leave_dates.keys())
-        return sorted(list(all_dates))
+        return leave_days_covered(employee.leave_dates for employee in self.employees.values())
 
     def _format_date_header(self, date):
         """Format date as 'Mon 25/11'."""
         return date.strftime('%a %d/%m')
 
-    def _get_status_initial(self, status):
-        """Get first character of status."""
-        return status[0] if status else ''
-
     def _get_all_locations(self):
-        """Get all unique locations including combined ones."""
-        locations = set()
-        for employee in self.employees.values():
-            for work_area in employee.work_areas:
-                locations.add(work_area.location)
-        return sorted(list(locations))
-
-    def _get_employees_for_location(self, location, include_combined=False):
-        """Get employees for a specific location or combined locations."""
-        if isinstance(location, tuple):
-            # Handle combined locations
-            combined_name, location_list = location
-            return {code: emp for code, emp in self.employees.items() if
-                    any(area.location in location_list for area in emp.work_areas)}
-        else:
-            # Handle single location
-            return {code: emp for code, emp in self.employees.items() if
-                    any(area.location == location for area in emp.work_areas)}
-
-    def _calculate_status_totals(self, filtered_employees, all_dates):
-        """Calculate totals per status and overall total for each date."""
-        status_totals = {}
-        overall_totals = {}
-
-        # Initialize totals dictionaries
-        for date in all_dates:
-            status_totals[date] = {}
-            overall_totals[date] = 0
-
-        # Calculate totals
-        for employee in filtered_employees.values():
-            for date in all_dates:
-                if date in employee.leave_dates:
-                    status = employee.leave_dates[date].status
-                    if status not in status_totals[date]:
-                        status_totals[date][status] = 0
-                    status_totals[date][status] += 1
-                    overall_totals[date] += 1
-
-        return status_totals, overall_totals
-
-    def _generate_worksheet(self, ws_name, filtered_employees, all_dates):
-        """Generate a worksheet for the given employees."""
-        ws = self.wb.create_sheet(ws_name)
+        """Get all unique locations of the employees on leave."""
+        return self.location_index.locations()
 
-        # Get location from worksheet name (keep existing location logic)
-        location = ws_name
-        if location == "GLOBAL":
-            location = None
-        elif any(combined[0][:31] == location for combined in self.COMBINED_LOCATIONS):
-            location = next(combined for combined in self.COMBINED_LOCATIONS if combined[0][:31] == location)
+    def _get_employees_for_location(self, location):
+        """Get employees for a specific location or a (group name, locations) group."""
+        return {code: self.employees[code] for code in self.location_index.employee_codes(location)}
+
+    def _generate_worksheet(self, ws_name, filtered_employees, all_dates, location=None, department_employees=None):
+        """Generate a worksheet for the given employees.
+
+        location is None for GLOBAL, a location name or a (combined name, locations) tuple.
+        department_employees are counted in the department table when the employee rows
+        are only part of the sheet's employees (defaults to filtered_employees).
+        """
+        ws = self.wb.create_sheet(ws_name)
 
         # Set up headers
         headers = ['Employee Name (Code)', 'Employment Type', 'Leave Count']
@@ -113,10 +92,34 @@ class LeaveReportGenerator:
             cell.border = Border(**border_style)
 
         # Write employee data
+        ordered_employees = sorted(filtered_employees.items(), key=lambda x: x[1].name)
+        if self.streaming and location is None:
+            self._stream_employee_rows(ws, ordered_employees, all_dates, max_col)
+        else:
+            self._write_employee_rows(ws, ordered_employees, all_dates, max_col)
+        row = 2 + len(ordered_employees) + 2  # Add spacing between tables
+
+        # Generate department table
+        if department_employees is None:
+            department_employees = filtered_employees
+        self._add_department_leave_table(ws, row, department_employees, all_dates, location)
+
+        # Adjust column widths
+        for col in range(1, len(headers) + 1):
+            column_letter = get_column_letter(col)
+            if col <= 2:
+                ws.column_dimensions[column_letter].width = 30
+            elif col == 3:
+                ws.column_dimensions[column_letter].width = 8
+            else:
+                ws.column_dimensions[column_letter].width = 12
+
+    def _write_employee_rows(self, ws, employees, all_dates, max_col):
+        """Write a row per (code, employee) from row 2, with a status initial under each date they're on leave."""
         row = 2
-        last_data_row = row + len(filtered_employees) - 1  # Calculate last row for border handling
+        last_data_row = row + len(employees) - 1  # Calculate last row for border handling
 
-        for emp_code, employee in sorted(filtered_employees.items(), key=lambda x: x[1].name):
+        for emp_code, employee in employees:
             for col in range(1, max_col + 1):
                 # Initialize all cells with basic border
                 cell = ws.cell(row=row, column=col)
@@ -145,41 +148,52 @@ class LeaveReportGenerator:
             # Status for each date
             for col, date in enumerate(all_dates, 4):
                 cell = ws.cell(row=row, column=col)
-                if date in employee.leave_dates:
-                    leave_date = employee.leave_dates[date]
-                    status = self._get_status_initial(leave_date.status)
-                    cell.value = status
-                    cell.fill = PatternFill(start_color=self.status_colors[leave_date.status],
-                                            end_color=self.status_colors[leave_date.status],
-                                            fill_type='solid')
+                status_code = employee.leave_dates.code_on(date)
+                if status_code:
+                    cell.value = self.status_initials[status_code]
+                    cell.fill = self.status_fills[status_code]
 
             row += 1
 
-        row += 2  # Add spacing between tables
-
-        # Generate department table
-        self._add_department_leave_table(ws, row, filtered_employees, all_dates, location)
-
-        # Adjust column widths
-        for col in range(1, len(headers) + 1):
-            column_letter = get_column_letter(col)
-            if col <= 2:
-                ws.column_dimensions[column_letter].width = 30
-            elif col == 3:
-                ws.column_dimensions[column_letter].width = 8
-            else:
-                ws.column_dimensions[column_letter].width = 12
+    def _stream_employee_rows(self, ws, employees, all_dates, max_col):
+        """Stream the same rows as _write_employee_rows into ws as XML, a template per cell style and status."""
+        if not employees:
+            return
+        wb = self.wb
+        last_data_row = len(employees) + 1
+        ordinals = [date.toordinal() for date in all_dates]
+
+        def row_templates(last_row):
+            def style(col, fill=None, horizontal='center'):
+                border = Border(left=Side(style='medium' if col == 1 else 'thin'),
+                                right=Side(style='medium' if col == max_col else 'thin'),
+                                top=Side(style='thin'), bottom=Side(style='medium' if last_row else 'thin'))
+                return wb.style_id(fill=fill, border=border, alignment=Alignment(horizontal=horizontal))
+
+            # Date cells by status code, for the inner date columns and the last
+            date_cells = [[wb.cell_xml(style(col, fill), self.status_initials[code] if code else None)
+                           for code, fill in enumerate(self.status_fills)] for col in (4, max_col)]
+            return style(1, horizontal='left'), style(2), style(3), date_cells
+
+        templates = {last_row: row_templates(last_row) for last_row in (False, True)}
+
+        def rows():
+            for row, (emp_code, employee) in enumerate(employees, 2):
+                name_style, type_style, count_style, (inner, last) = templates[row == last_data_row]
+                codes = employee.leave_dates.codes_on(ordinals)
+                cells = [wb.cell_xml(name_style, f"{employee.name} ({emp_code})"),
+                         wb.cell_xml(type_style, employee.employment_type),
+                         wb.cell_xml(count_style, len(employee.leave_dates))]
+                cells.extend(map(inner.__getitem__, codes[:-1]))
+                if codes:
+                    cells.append(last[codes[-1]])
+                yield row, ''.join(cells)
+
+        wb.stream_rows(ws, 2, last_data_row, max_col, rows())
 
     def _get_color_for_ratio(self, on_leave, total):
         """Calculate cell color based on ratio of employees on leave."""
-        if total == 0 or on_leave == 0:
-            return None
-        ratio = on_leave / total
-        # Convert ratio to hex color from white (FFFFFF) to red (FF0000)
-        intensity = int(ratio * 255)
-        red = 255
-        green = blue = 255 - intensity
-        return f"{red:02x}{green:02x}{blue:02x}"
+        return ratio_color(on_leave, total)
 
     def _get_all_employees_by_department(self, employee_manager):
         """Get unique employee count per department including ALL employees."""
@@ -197,8 +211,8 @@ class LeaveReportGenerator:
         row = start_row
 
         # Get departments and counts filtered by location
-        department_counts = self._get_department_employee_counts(location, self.employee_manager)
-        departments = self._get_departments_for_location(location, self.employee_manager)
+        department_counts = self._get_department_employee_counts(location)
+        departments = self._get_departments_for_location(location)
 
         # Table headers
         ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=2)
@@ -287,6 +301,58 @@ class LeaveReportGenerator:
 
         return row + 2
 
+    def _get_sheet_targets(self):
+        """Get (sheet name, employees, location) for every sheet of the report, in order."""
+        namer = SheetNamer(reserved=(INDEX_SHEET_NAME, SUMMARY_SHEET_NAME))
+        targets = [(namer.name('GLOBAL'), self.employees, None)]
+
+        # Location-specific worksheets
+        locations = self._get_all_locations()
+        for location in locations:
+            filtered_employees = self._get_employees_for_location(location)
+            if filtered_employees:  # Only create sheet if there are employees
+                targets.append((namer.name(location), filtered_employees, location))
+
+        # Combined location worksheets
+        for group_name, group_locations in self.location_groups:
+            filtered_employees = self._get_employees_for_location((group_name, group_locations))
+            if filtered_employees:
+                targets.append((namer.name(group_name), filtered_employees, (group_name, group_locations)))
+
+        return targets
+
+    def get_sheet_names(self):
+        """Get the names of the sheets generate_report creates."""
+        return [name for name, _, _ in self._get_sheet_targets()]
+
+    def _plan_sheets(self, targets, all_dates):
+        """Split each target sheet into parts that fit Excel's row and column limits and the cell budget.
+
+        Returns (sheet name, source sheet name, employees, dates, location) per sheet to create.
+        A sheet that needs no split keeps its name; parts are named 'GLOBAL (1)', 'GLOBAL (2)'...
+        """
+        split = []
+        for sheet_name, filtered_employees, location in targets:
+            # Header, spacing and the department table sit around the employee rows
+            fixed_rows = 4 + len(self._get_departments_for_location(location))
+            ordered = sorted(filtered_employees.items(), key=lambda x: x[1].name)
+            row_chunks = chunk_sizes(len(ordered), MAX_ROWS - fixed_rows)
+            rows_per_sheet = max(stop - start for start, stop in row_chunks) + fixed_rows
+            date_chunks = plan_date_shards(len(all_dates), 3, rows_per_sheet, self.cell_budget)
+            parts = [(rows, dates) for rows in row_chunks for dates in date_chunks]
+            split.append((sheet_name, ordered, location, parts))
+
+        # A split sheet's own name goes unused, so only the unsplit names are kept from its parts
+        namer = SheetNamer(reserved=[INDEX_SHEET_NAME, SUMMARY_SHEET_NAME] +
+                           [sheet_name for sheet_name, _, _, parts in split if len(parts) == 1])
+        plan = []
+        for sheet_name, ordered, location, parts in split:
+            names = [sheet_name] if len(parts) == 1 else namer.part_names(sheet_name, len(parts))
+            for name, ((row_start, row_stop), (date_start, date_stop)) in zip(names, parts):
+                plan.append((name, sheet_name, dict(ordered[row_start:row_stop]), all_dates[date_start:date_stop],
+                             location))
+        return plan
+
     def generate_report(self):
         """Generate the leave report in Excel format."""
         # Get all unique dates
@@ -296,82 +362,61 @@ class LeaveReportGenerator:
         if 'Sheet' in self.wb.sheetnames:
             self.wb.remove(self.wb['Sheet'])
 
-        # Generate GLOBAL worksheet
-        self._generate_worksheet('GLOBAL', self.employees, all_dates)
-
-        # Generate location-specific worksheets
-        locations = self._get_all_locations()
-        for location in locations:
-            filtered_employees = self._get_employees_for_location(location)
-            if filtered_employees:  # Only create sheet if there are employees
-                safe_name = str(location)[:31]  # Excel worksheet names limited to 31 chars
-                self._generate_worksheet(safe_name, filtered_employees, all_dates)
-
-        # Generate combined location worksheets
-        for combined_name, location_list in self.COMBINED_LOCATIONS:
-            filtered_employees = self._get_employees_for_location((combined_name, location_list))
-            if filtered_employees:
-                safe_name = combined_name[:31]
-                self._generate_worksheet(safe_name, filtered_employees, all_dates)
-
-    def save_report(self, directory):
-        """Save the report with the specified naming convention."""
+        targets = self._get_sheet_targets()
+        self._generate_sheets(self._plan_sheets(targets, all_dates), targets)
+        self._add_summary_sheet()
+
+    def _add_summary_sheet(self):
+        """Add the summary sheet in front of the others, pivoted from the leave matrix."""
+        leave_matrix = self.leave_matrix
+        if leave_matrix is None:
+            leave_matrix = LeaveMatrix.from_employee_manager(self.employee_manager)
+        add_summary_sheet(self.wb, LeaveSummary(leave_matrix), self.employee_manager.leave_status_manager.code_colors)
+
+    def generate_sheet(self, sheet_name):
+        """Generate just one sheet of the report. Returns the names of the sheets created for it, if any."""
+        targets = [target for target in self._get_sheet_targets() if target[0] == sheet_name]
+        if not targets:
+            return []
+        if 'Sheet' in self.wb.sheetnames:
+            self.wb.remove(self.wb['Sheet'])
+        plan = self._plan_sheets(targets, self._get_all_leave_dates())
+        self._generate_sheets(plan, targets)
+        return [name for name, *_ in plan]
+
+    def _generate_sheets(self, plan, targets):
+        """Create the planned sheets, with an index first if any sheet was split."""
+        employees_by_target = {name: filtered_employees for name, filtered_employees, _ in targets}
+        for name, source_name, filtered_employees, dates, location in plan:
+            self._generate_worksheet(name, filtered_employees, dates, location,
+                                     department_employees=employees_by_target[source_name])
+
+        if len(plan) > len(targets):
+            add_index_sheet(self.wb, [(name, source_name, dates[0] if dates else None,
+                                       dates[-1] if dates else None, len(filtered_employees))
+                                      for name, source_name, filtered_employees, dates, _ in plan])
+
+    def save_report(self, directory, saver=None):
+        """Save the report with the specified naming convention, through saver (a WorkbookSaver) if given."""
         current_date = datetime.now()
         month_year = current_date.strftime("%d %b %Y")
         filename = f"Leave Report {month_year}.xlsx"
         filepath = os.path.join(directory, filename)
-        self.wb.save(filepath)
-        print(f"Saved: {os.path.basename(filename)}")
-
-    def _get_departments_for_location(self, location, employee_manager):
-        """Get departments for a specific location or combined locations."""
-        departments = set()
-        if isinstance(location, tuple):
-            # Handle combined locations
-            combined_name, location_list = location
-            for emp in employee_manager.employees.values():
-                if any(area.location in location_list for area in emp.work_areas):
-                    departments.update(area.department for area in emp.work_areas
-                                       if area.location in location_list)
-        else:
-            # Handle single location
-            for emp in employee_manager.employees.values():
-                if any(area.location == location for area in emp.work_areas):
-                    departments.update(area.department for area in emp.work_areas
-                                       if area.location == location)
-        return sorted(list(departments))
-
-    def _get_department_employee_counts(self, location, employee_manager):
-        """Get unique employee count per department for a specific location."""
-        department_counts = {}
+        (saver or WorkbookSaver()).save(self.wb, filepath)
 
-        if isinstance(location, tuple):
-            # Handle combined locations
-            combined_name, location_list = location
-            for emp_code, emp in employee_manager.employees.items():
-                if any(area.location in location_list for area in emp.work_areas):
-                    for work_area in emp.work_areas:
-                        if work_area.location in location_list:
-                            dept = work_area.department
-                            if dept not in department_counts:
-                                department_counts[dept] = set()
-                            department_counts[dept].add(emp_code)
-        else:
-            # Handle single location
-            for emp_code, emp in employee_manager.employees.items():
-                if any(area.location == location for area in emp.work_areas):
-                    for work_area in emp.work_areas:
-                        if work_area.location == location:
-                            dept = work_area.department
-                            if dept not in department_counts:
-                                department_counts[dept] = set()
-                            department_counts[dept].add(emp_code)
+    def _get_departments_for_location(self, location):
+        """Get departments for a specific location or a (group name, locations) group."""
+        return sorted(self.all_location_index.department_counts(location))
 
-        return {dept: len(employees) for dept, employees in department_counts.items()}
+    def _get_department_employee_counts(self, location):
+        """Get unique employee count per department for a specific location or group."""
+        return self.all_location_index.department_counts(location)
 
 
-def generate_leave_report(employees, output_directory, employee_manager):
+def generate_leave_report(employees, output_directory, employee_manager, cell_budget=None, location_groups=None,
+                          leave_matrix=None, saver=None):
     """Main function to generate and save the leave report."""
-    report_generator = LeaveReportGenerator(employees, employee_manager)
+    report_generator = LeaveReportGenerator(employees, employee_manager, cell_budget, location_groups, leave_matrix,
+                                            streaming=True)
     report_generator.generate_report()
-    report_generator.save_report(output_directory)
+    report_generator.save_report(output_directory, saver)
@@ -1,42 +1,277 @@
-from datetime import timedelta
+import hashlib
+import json
+import os
+import pickle
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date as date_type, timedelta
 
 import pandas as pd
 
+from scripts.exclusion_rules import ExclusionRules
+
+LEAVE_COLUMNS = ['Employee_Code', 'Employee_Name', 'Shift_Type', 'Start_Time', 'End_Time', 'Status']
+WORK_AREA_COLUMNS = ['Employee_Code', 'Employee_Name', 'Employment_Type_Name', 'Location', 'Department', 'Role']
+
+# Colours handed out to leave status codes in turn
+STATUS_PALETTE = ('FF0000', '00FF00', '0000FF', 'FFFF00', '00FFFF', 'FF00FF')
+
+
+def load_status_codes(path=None):
+    """Load a saved status code table - a JSON list of statuses, the first having code 1."""
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        with open(path, encoding='utf-8') as f:
+            statuses = json.load(f)
+        if not isinstance(statuses, list):
+            raise ValueError("expected a list of statuses")
+        return [str(status) for status in statuses]
+    except (OSError, ValueError) as e:
+        print(f"Error reading status codes {path}: {e} - coding statuses afresh")
+        return []
+
 
 class LeaveStatusManager:
-    def __init__(self):
+    """Known leave statuses, each with a small integer code that never changes once given.
+
+    Code 0 means no leave. Colours follow the code rather than the sorted position, so a
+    new status doesn't recolour the others, and renderers index the dense code_colors and
+    code_initials lists by code instead of looking statuses up by name.
+    """
+
+    def __init__(self, coded_statuses=()):
         self.statuses = set()
-        self.colors = ['FF0000', '00FF00', '0000FF', 'FFFF00', '00FFFF', 'FF00FF']
+        self.colors = list(STATUS_PALETTE)
         self.status_colors = {}
+        self.codes = {}
+        self.code_statuses = [None]
+        self.code_colors = [None]
+        self.code_initials = ['']
+        for status in coded_statuses:
+            if status not in self.codes:
+                self._add_code(status)
+
+    def _add_code(self, status):
+        code = len(self.code_statuses)
+        self.codes[status] = code
+        self.code_statuses.append(status)
+        self.code_colors.append(self.colors[(code - 1) % len(self.colors)])
+        self.code_initials.append(status[0] if status else '')
+        return code
+
+    def code_of(self, status):
+        """Get the status's code, giving it the next free one if it has none yet."""
+        code = self.codes.get(status)
+        return code if code is not None else self._add_code(status)
+
+    def add_codes(self, statuses):
+        """Get the codes of several statuses; uncoded ones are given codes in alphabetical order."""
+        for status in sorted(set(statuses) - self.codes.keys()):
+            self._add_code(status)
+        return [self.codes[status] for status in statuses]
 
     def add_status(self, status):
         """Add a new leave status to the set of known statuses."""
+        self.code_of(status)
         self.statuses.add(status)
 
+    def remove_status(self, status):
+        """Remove a leave status that no longer appears in the data - its code stays reserved."""
+        self.statuses.discard(status)
+
     def assign_colors(self):
-        """Assign colors to statuses (sorted alphabetically)."""
-        sorted_statuses = sorted(self.statuses)
-        self.status_colors = {
-            status: self.colors[i % len(self.colors)]
-            for i, status in enumerate(sorted_statuses)
-        }
+        """Map each known status to the colour of its code."""
+        self.status_colors = {status: self.code_colors[self.codes[status]]
+                              for status in sorted(self.statuses)}
         return self.status_colors
 
     def get_all_statuses(self):
         """Return all known leave statuses."""
         return sorted(list(self.statuses))
 
+    def save_codes(self, path):
+        """Save the code table so later runs give every status the same code and colour."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.code_statuses[1:], f, indent=1)
+        os.replace(temp_path, path)
+
 
 class LeaveDate:
-    def __init__(self, date, status, shift_type):
+    def __init__(self, date, status, shift_type, status_code=0):
         self.date = date
         self.status = status
         self.shift_type = shift_type
+        self.status_code = status_code
 
     def __repr__(self):
         return f"{self.date} ({self.status} - {self.shift_type})"
 
 
+class LeaveIntervals:
+    """Leave for one employee stored as sorted, non-overlapping day ranges.
+
+    Ranges are kept as inclusive date ordinals in parallel lists so "on leave at date D"
+    and "overlapping range R" are binary searches, and a months-long block is a single
+    entry rather than one LeaveDate per day. It also behaves as a read-only mapping of
+    date -> LeaveDate, building LeaveDate objects only for the days that are looked up.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._ends = []
+        self._values = []  # (status, shift_type, status code) per range
+        self._day_count = 0
+
+    def add(self, start, end, status, shift_type, status_code=0):
+        """Add leave from start to end (inclusive dates).
+
+        Matches adding the days one at a time: a day already on leave with the same
+        status keeps its existing entry, any other overlapped day takes the new one.
+        """
+        first, last = start.toordinal(), end.toordinal()
+        if last < first:
+            return
+        new_value = (status, shift_type, status_code)
+        i = bisect_left(self._ends, first)
+        j = bisect_right(self._starts, last)
+
+        pieces = []
+        cursor = first
+        for k in range(i, j):
+            range_start, range_end, value = self._starts[k], self._ends[k], self._values[k]
+            if range_start < first:
+                pieces.append((range_start, first - 1, value))
+            overlap_start, overlap_end = max(range_start, first), min(range_end, last)
+            if cursor < overlap_start:
+                pieces.append((cursor, overlap_start - 1, new_value))
+            pieces.append((overlap_start, overlap_end, value if value[0] == status else new_value))
+            cursor = overlap_end + 1
+            if range_end > last:
+                pieces.append((last + 1, range_end, value))
+        if cursor <= last:
+            pieces.append((cursor, last, new_value))
+
+        # Widen the replaced slice to touching neighbours so equal ranges merge
+        if i > 0 and self._ends[i - 1] == pieces[0][0] - 1 and self._values[i - 1] == pieces[0][2]:
+            i -= 1
+            pieces.insert(0, (self._starts[i], self._ends[i], self._values[i]))
+        if j < len(self._starts) and self._starts[j] == pieces[-1][1] + 1 and self._values[j] == pieces[-1][2]:
+            pieces.append((self._starts[j], self._ends[j], self._values[j]))
+            j += 1
+
+        merged = [pieces[0]]
+        for piece in pieces[1:]:
+            previous = merged[-1]
+            if previous[1] + 1 == piece[0] and previous[2] == piece[2]:
+                merged[-1] = (previous[0], piece[1], previous[2])
+            else:
+                merged.append(piece)
+
+        self._day_count -= sum(self._ends[k] - self._starts[k] + 1 for k in range(i, j))
+        self._day_count += sum(piece_end - piece_start + 1 for piece_start, piece_end, _ in merged)
+        self._starts[i:j] = [piece[0] for piece in merged]
+        self._ends[i:j] = [piece[1] for piece in merged]
+        self._values[i:j] = [piece[2] for piece in merged]
+
+    def _find(self, date):
+        ordinal = date.toordinal()
+        k = bisect_right(self._starts, ordinal) - 1
+        if k >= 0 and self._ends[k] >= ordinal:
+            return k
+        return -1
+
+    def status_on(self, date):
+        """Get the leave status on a date, or None if not on leave."""
+        k = self._find(date)
+        return self._values[k][0] if k >= 0 else None
+
+    def code_on(self, date):
+        """Get the leave status code on a date, or 0 if not on leave."""
+        k = self._find(date)
+        return self._values[k][2] if k >= 0 else 0
+
+    def overlapping(self, start, end):
+        """Get (start, end, status, shift_type) for every range overlapping start..end (inclusive)."""
+        i = bisect_left(self._ends, start.toordinal())
+        j = bisect_right(self._starts, end.toordinal())
+        return [(date_type.fromordinal(self._starts[k]), date_type.fromordinal(self._ends[k])) + self._values[k][:2]
+                for k in range(i, j)]
+
+    def intervals(self):
+        """Get (start, end, status, shift_type) for every range, in date order."""
+        return [(date_type.fromordinal(range_start), date_type.fromordinal(range_end)) + value[:2]
+                for range_start, range_end, value in zip(self._starts, self._ends, self._values)]
+
+    def ordinal_ranges(self):
+        """Get (first ordinal, last ordinal, status) for every range - cheap input for bulk processing."""
+        return [(range_start, range_end, value[0])
+                for range_start, range_end, value in zip(self._starts, self._ends, self._values)]
+
+    def code_ranges(self):
+        """Get (first ordinal, last ordinal, status code) for every range."""
+        return [(range_start, range_end, value[2])
+                for range_start, range_end, value in zip(self._starts, self._ends, self._values)]
+
+    def codes_on(self, ordinals):
+        """Get the status code on each of the sorted date ordinals, 0 where not on leave."""
+        codes = [0] * len(ordinals)
+        for range_start, range_end, value in zip(self._starts, self._ends, self._values):
+            i, j = bisect_left(ordinals, range_start), bisect_right(ordinals, range_end)
+            codes[i:j] = [value[2]] * (j - i)
+        return codes
+
+    def __contains__(self, date):
+        return self._find(date) >= 0
+
+    def __getitem__(self, date):
+        k = self._find(date)
+        if k < 0:
+            raise KeyError(date)
+        return LeaveDate(date, *self._values[k])
+
+    def get(self, date, default=None):
+        k = self._find(date)
+        return LeaveDate(date, *self._values[k]) if k >= 0 else default
+
+    def __len__(self):
+        return self._day_count
+
+    def __iter__(self):
+        for range_start, range_end in zip(self._starts, self._ends):
+            for ordinal in range(range_start, range_end + 1):
+                yield date_type.fromordinal(ordinal)
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (self[date] for date in self)
+
+    def items(self):
+        return ((date, self[date]) for date in self)
+
+
+def leave_days_covered(leave_interval_sets):
+    """Get the sorted list of dates on which at least one of the given LeaveIntervals has leave.
+
+    Ranges are merged before being expanded, so each day is only produced once.
+    """
+    ranges = sorted((range_start, range_end)
+                    for leave in leave_interval_sets
+                    for range_start, range_end, _ in leave.ordinal_ranges())
+    days = []
+    last_added = None
+    for range_start, range_end in ranges:
+        first = range_start if last_added is None else max(range_start, last_added + 1)
+        days.extend(date_type.fromordinal(ordinal) for ordinal in range(first, range_end + 1))
+        if last_added is None or range_end > last_added:
+            last_added = range_end
+    return days
+
+
 class WorkArea:
     def __init__(self, location, department, role):
         self.location = location
@@ -58,95 +293,337 @@ class Employee:
         self.emp_code = emp_code
         self.name = name
         self.employment_type = employment_type
-        self.leave_dates = {}
+        self.leave_dates = LeaveIntervals()
         self.work_areas = set()
 
-    def add_leave_date(self, leave_date, status, shift_type):
-        if leave_date not in self.leave_dates or self.leave_dates[leave_date].status != status:
-            self.leave_dates[leave_date] = LeaveDate(leave_date, status, shift_type)
+    def add_leave_date(self, leave_date, status, shift_type, status_code=0):
+        self.leave_dates.add(leave_date, leave_date, status, shift_type, status_code)
+
+    def add_leave_interval(self, start_date, end_date, status, shift_type, status_code=0):
+        self.leave_dates.add(start_date, end_date, status, shift_type, status_code)
 
     def add_work_area(self, work_area):
         self.work_areas.add(work_area)
 
 
+def _leave_day_bounds(leave_data):
+    """Vectorized first and last leave day of every row.
+
+    An end time of midnight belongs to the day before, and a multi-day row covers the
+    whole days after its start time - the days a daily range from the start would give.
+
+    Returns two Series of datetime64 days (NaT where a time couldn't be parsed).
+    """
+    start_times = pd.to_datetime(leave_data['Start_Time'], errors='coerce')
+    end_times = pd.to_datetime(leave_data['End_Time'], errors='coerce')
+    end_times = end_times.mask(end_times == end_times.dt.normalize(), end_times - timedelta(minutes=1))
+    first_days = start_times.dt.normalize()
+    whole_days = (end_times - start_times).dt.days
+    last_days = first_days + pd.to_timedelta(whole_days, unit='D')
+    last_days = last_days.mask(first_days == end_times.dt.normalize(), first_days)
+    return first_days, last_days
+
+
+def select_leave_rows_in_window(leave_data, window):
+    """Drop leave rows that fall entirely outside window (a (start date, end date) pair).
+
+    This runs before any rows are expanded, so leave far outside the reporting
+    horizon costs nothing further. Rows whose times can't be parsed are kept.
+    """
+    if window is None or leave_data is None:
+        return leave_data
+    first_days, last_days = _leave_day_bounds(leave_data)
+    window_start, window_end = pd.Timestamp(window[0]), pd.Timestamp(window[1])
+    outside = (first_days > window_end) | (last_days < window_start)
+    return leave_data[~outside.fillna(False)]
+
+
+def _factorize(column):
+    """(integer code per row, list of distinct values) - a categorical column's own codes when it is one."""
+    codes, values = pd.factorize(column, use_na_sentinel=False)
+    return codes, list(values)
+
+
+def _row_keys(df, columns):
+    """Hash each row of df so rows can be matched between two exports.
+
+    Returns a Series of employee codes indexed by row hash.
+    """
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return pd.Series(df['Employee_Code'].astype(str).to_numpy(), index=hashes)
+
+
 class EmployeeManager:
-    def __init__(self, leave_data, work_areas_data):
-        self.leave_data = leave_data
+    # Bump when the pickled state layout changes so old state files are rebuilt
+    STATE_VERSION = 6
+
+    def __init__(self, leave_data, work_areas_data, window=None, exclusion_rules=None, status_codes=()):
+        self.window = window
+        self.leave_data = select_leave_rows_in_window(leave_data, window)
         self.work_areas_data = work_areas_data
         self.employees = {}
-        self.leave_status_manager = LeaveStatusManager()
+        # Statuses in code order from earlier runs (see load_status_codes), so their colours carry over
+        self.leave_status_manager = LeaveStatusManager(status_codes)
         self.departments = set()
-        # Define keywords for filtering out employees
-        self.EXCLUDED_NAME_KEYWORDS = {'DNR', 'CANCELLED', 'XXX'}
+        # Rules for filtering out employees
+        self.exclusion_rules = exclusion_rules if exclusion_rules is not None else ExclusionRules()
+
+        # Reference counts behind self.departments and the known statuses, so they
+        # can be kept up to date when only some employees are rebuilt
+        self._department_counts = Counter()
+        self._status_counts = Counter()
+        self._employee_status_counts = {}
+        self._leave_row_keys = None
+        self._work_area_row_keys = None
 
-    def should_exclude_employee(self, name):
-        """Check if employee should be excluded based on name keywords."""
-        upper_name = name.upper()
-        return any(keyword in upper_name for keyword in self.EXCLUDED_NAME_KEYWORDS)
+    def should_exclude_employee(self, name, emp_code=None):
+        """Check if employee should be excluded by the exclusion rules."""
+        return self.exclusion_rules.excludes(name, emp_code)
 
     def get_status_colors(self):
         """Get the color mapping for all leave statuses."""
         return self.leave_status_manager.status_colors
 
     def process_employees(self):
-        self._process_work_areas()
-        self._process_leave_dates()
+        self._process_work_areas(self.work_areas_data)
+        self._process_leave_dates(self.leave_data)
         self.leave_status_manager.assign_colors()
+        self._leave_row_keys = _row_keys(self.leave_data, LEAVE_COLUMNS)
+        self._work_area_row_keys = _row_keys(self.work_areas_data, WORK_AREA_COLUMNS)
+
+    def apply_update(self, leave_data, work_areas_data, window=None):
+        """Bring the processed state up to date with a new pair of exports.
+
+        Rows are matched against the previous exports by hash. Only employees with an
+        added, removed or changed leave or work-area row are rebuilt, so the cost
+        follows the size of the change rather than the size of the export. When the
+        reporting window moves, employees with leave cut off at either the old or new
+        window edges are rebuilt as well.
+        Returns the set of employee codes that were rebuilt.
+        """
+        leave_data = select_leave_rows_in_window(leave_data, window)
+        if self._leave_row_keys is None or self._work_area_row_keys is None:
+            self.leave_data, self.work_areas_data, self.window = leave_data, work_areas_data, window
+            self.process_employees()
+            return set(self.employees)
+
+        new_leave_keys = _row_keys(leave_data, LEAVE_COLUMNS)
+        new_work_area_keys = _row_keys(work_areas_data, WORK_AREA_COLUMNS)
+
+        affected = set()
+        for old_keys, new_keys in ((self._leave_row_keys, new_leave_keys),
+                                   (self._work_area_row_keys, new_work_area_keys)):
+            added = ~new_keys.index.isin(old_keys.index)
+            removed = ~old_keys.index.isin(new_keys.index)
+            affected.update(new_keys[added].unique())
+            affected.update(old_keys[removed].unique())
+
+        if window != self.window:
+            affected.update(self._employees_clipped_by(self.window))
+            affected.update(self._rows_clipped_by(leave_data, window))
+
+        self.leave_data, self.work_areas_data, self.window = leave_data, work_areas_data, window
+        self._leave_row_keys, self._work_area_row_keys = new_leave_keys, new_work_area_keys
+
+        if not affected:
+            return affected
+
+        for emp_code in affected:
+            self._remove_employee(emp_code)
+
+        # Work areas first - leave rows are only kept for employees that exist
+        self._process_work_areas(work_areas_data[work_areas_data['Employee_Code'].astype(str).isin(affected)])
+        self._process_leave_dates(leave_data[leave_data['Employee_Code'].astype(str).isin(affected)])
+        self.leave_status_manager.assign_colors()
+        self._order_employees(work_areas_data)
+        return affected
+
+    def _order_employees(self, work_areas_data):
+        """Put employees back in the order a fresh build gives: first appearance in the kept work-area rows.
+
+        Rebuilt employees are re-added at the end, so without this the row order of the
+        matrix, the data export and name ties in the sheets would depend on update history.
+        """
+        kept = work_areas_data.loc[~self.exclusion_rules.mask(work_areas_data), 'Employee_Code']
+        emp_codes = pd.unique(kept.astype(str).to_numpy())
+        self.employees = {emp_code: self.employees[emp_code] for emp_code in emp_codes}
+
+    def add_employee(self, employee):
+        """Register an already built Employee, e.g. one restored from the history store."""
+        self._remove_employee(employee.emp_code)
+        self.employees[employee.emp_code] = employee
+        for work_area in employee.work_areas:
+            self.departments.add(work_area.department)
+            self._department_counts[work_area.department] += 1
+
+        status_counts = Counter(status for _, _, status in employee.leave_dates.ordinal_ranges())
+        for status, count in status_counts.items():
+            self.leave_status_manager.add_status(status)
+            self._status_counts[status] += count
+        self._employee_status_counts[employee.emp_code] = status_counts
+
+    def source_fingerprint(self):
+        """Fingerprint of the processed exports and window, or None if they aren't known."""
+        if self._leave_row_keys is None or self._work_area_row_keys is None:
+            return None
+        digest = hashlib.sha1()
+        for keys in (self._leave_row_keys, self._work_area_row_keys):
+            digest.update(pd.Index(keys.index).sort_values().to_numpy().tobytes())
+        digest.update(repr(self.window).encode())
+        return digest.hexdigest()
+
+    def _employees_clipped_by(self, window):
+        """Codes of employees whose stored leave may have been cut off at the window edges."""
+        if window is None:
+            return set()
+        edges = (window[0].toordinal(), window[1].toordinal())
+        clipped = set()
+        for emp_code, employee in self.employees.items():
+            ranges = employee.leave_dates.ordinal_ranges()
+            if ranges and (ranges[0][0] == edges[0] or ranges[-1][1] == edges[1]):
+                clipped.add(emp_code)
+        return clipped
+
+    def _rows_clipped_by(self, leave_data, window):
+        """Codes of employees with a leave row that extends past the window edges."""
+        if window is None:
+            return set()
+        first_days, last_days = _leave_day_bounds(leave_data)
+        crosses = (first_days < pd.Timestamp(window[0])) | (last_days > pd.Timestamp(window[1]))
+        return set(leave_data.loc[crosses.fillna(False), 'Employee_Code'].astype(str))
+
+    def _remove_employee(self, emp_code):
+        """Drop an employee and their contribution to the department and status sets."""
+        employee = self.employees.pop(emp_code, None)
+        if employee is not None:
+            for work_area in employee.work_areas:
+                self._release_department(work_area.department)
+
+        for status, count in self._employee_status_counts.pop(emp_code, Counter()).items():
+            self._status_counts[status] -= count
+            if self._status_counts[status] <= 0:
+                del self._status_counts[status]
+                self.leave_status_manager.remove_status(status)
+
+    def _release_department(self, department):
+        self._department_counts[department] -= 1
+        if self._department_counts[department] <= 0:
+            del self._department_counts[department]
+            self.departments.discard(department)
+
+    def save_state(self, path):
+        """Save the processed state so a later run can apply just the changes."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump((self.STATE_VERSION, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_state(cls, path):
+        """Load state saved by save_state, or return None if it is missing or unusable."""
+        try:
+            with open(path, 'rb') as f:
+                version, manager = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError):
+            return None
+        if version != cls.STATE_VERSION or not isinstance(manager, cls):
+            return None
+        return manager
+
+    def __getstate__(self):
+        # The source DataFrames are re-read on every run, only the row keys are needed to diff them
+        state = self.__dict__.copy()
+        state['leave_data'] = None
+        state['work_areas_data'] = None
+        return state
+
+    def _process_work_areas(self, work_areas_data):
+        # Excluded rows are dropped before any objects are built
+        excluded = self.exclusion_rules.mask(work_areas_data)
+        if excluded.any():
+            skipped = work_areas_data[excluded]
+            skipped_employees = [f"{name} ({emp_code})" for name, emp_code in
+                                 zip(skipped['Employee_Name'], skipped['Employee_Code'].astype(str))]
+            work_areas_data = work_areas_data[~excluded]
+        else:
+            skipped_employees = []
+
+        emp_codes = work_areas_data['Employee_Code'].astype(str).to_numpy()
+        name_codes, names = _factorize(work_areas_data['Employee_Name'])
+        type_codes, employment_types = _factorize(work_areas_data['Employment_Type_Name'])
+        location_codes, locations = _factorize(work_areas_data['Location'])
+        department_codes, departments = _factorize(work_areas_data['Department'])
+        role_codes, roles = _factorize(work_areas_data['Role'])
+
+        # Work areas are built once per distinct location/department/role rather than per row
+        work_areas = {}
+
+        for emp_code, name_code, type_code, location_code, department_code, role_code in zip(
+                emp_codes, name_codes, type_codes, location_codes, department_codes, role_codes):
+            area_key = (location_code, department_code, role_code)
+            work_area = work_areas.get(area_key)
+            if work_area is None:
+                work_area = work_areas[area_key] = WorkArea(locations[location_code], departments[department_code],
+                                                            roles[role_code])
 
-    def _process_work_areas(self):
-        skipped_employees = []
-        for _, row in self.work_areas_data.iterrows():
-            emp_code = str(row['Employee_Code'])
-            name = row['Employee_Name']
-
-            # Track skipped employees
-            if self.should_exclude_employee(name):
-                skipped_employees.append(f"{name} ({emp_code})")
-                continue
-
-            employment_type = row['Employment_Type_Name']
-            work_area = WorkArea(row['Location'], row['Department'], row['Role'])
+            if emp_code not in self.employees:
+                self.employees[emp_code] = Employee(emp_code, names[name_code], employment_types[type_code])
 
             # Track departments
-            self.departments.add(row['Department'])
-
-            if emp_code not in self.employees:
-                self.employees[emp_code] = Employee(emp_code, name, employment_type)
+            if work_area not in self.employees[emp_code].work_areas:
+                self.departments.add(work_area.department)
+                self._department_counts[work_area.department] += 1
 
             self.employees[emp_code].add_work_area(work_area)
 
         if skipped_employees:
-            print("\nSkipped employees due to name filtering:")
+            print("\nSkipped employees due to the exclusion rules:")
             for emp in sorted(skipped_employees):
                 print(f"  - {emp}")
             print(f"Total skipped: {len(skipped_employees)}")
 
-    def _process_leave_dates(self):
+    def _process_leave_dates(self, leave_data):
         skipped_entries = []
-        for _, row in self.leave_data.iterrows():
-            emp_code = str(row['Employee_Code'])
+        unreadable_entries = []
+        emp_codes = leave_data['Employee_Code'].astype(str).to_numpy()
+        name_codes, names = _factorize(leave_data['Employee_Name'])
+        status_codes, statuses = _factorize(leave_data['Status'])
+        # Statuses are coded once per distinct value here - nothing downstream looks them up by name
+        coded_statuses = self.leave_status_manager.add_codes(list(statuses))
+        shift_type_codes, shift_types = _factorize(leave_data['Shift_Type'])
+
+        # First and last day of every row at once, instead of parsing two times per row
+        first_days, last_days = _leave_day_bounds(leave_data)
+        first_days = first_days.to_numpy(dtype=object)
+        last_days = last_days.to_numpy(dtype=object)
+
+        for emp_code, name_code, status_code, shift_type_code, first_day, last_day in zip(
+                emp_codes, name_codes, status_codes, shift_type_codes, first_days, last_days):
 
             # Track skipped leave entries
             if emp_code not in self.employees:
-                name = row['Employee_Name']
-                skipped_entries.append(f"{name} ({emp_code})")
+                skipped_entries.append(f"{names[name_code]} ({emp_code})")
+                continue
+            if pd.isna(first_day) or pd.isna(last_day):
+                unreadable_entries.append(f"{names[name_code]} ({emp_code})")
                 continue
 
-            start_time = pd.to_datetime(row['Start_Time'])
-            end_time = pd.to_datetime(row['End_Time'])
-            status = row['Status']
-            shift_type = row['Shift_Type']
+            status = statuses[status_code]
+            shift_type = shift_types[shift_type_code]
 
             self.leave_status_manager.add_status(status)
+            self._status_counts[status] += 1
+            self._employee_status_counts.setdefault(emp_code, Counter())[status] += 1
 
-            if end_time.time() == pd.Timestamp('00:00:00').time():
-                end_time -= timedelta(minutes=1)
+            start_date, end_date = first_day.date(), last_day.date()
 
-            if start_time.date() == end_time.date():
-                self.employees[emp_code].add_leave_date(start_time.date(), status, shift_type)
-            else:
-                for date in pd.date_range(start=start_time, end=end_time, freq='D'):
-                    self.employees[emp_code].add_leave_date(date.date(), status, shift_type)
+            # Clip to the reporting window so only days that can be reported are stored
+            if self.window is not None:
+                start_date = max(start_date, self.window[0])
+                end_date = min(end_date, self.window[1])
+            self.employees[emp_code].add_leave_interval(start_date, end_date, status, shift_type,
+                                                        coded_statuses[status_code])
 
         if skipped_entries:
             print("\nSkipped leave entries due to unknown employee codes:")
@@ -154,6 +631,12 @@ class EmployeeManager:
                 print(f"  - {entry}")
             print(f"Total skipped: {len(set(skipped_entries))}")
 
+        if unreadable_entries:
+            print("\nSkipped leave entries with unreadable start or end times:")
+            for entry in sorted(set(unreadable_entries)):
+                print(f"  - {entry}")
+            print(f"Total skipped: {len(unreadable_entries)}")
+
     def get_department_leave_counts(self, date):
         """Get leave counts per department and status for a specific date."""
         department_counts = {dept: {status: 0 for status in self.leave_status_manager.get_all_statuses()}
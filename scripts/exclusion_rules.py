@@ -0,0 +1,78 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Exclusion rules file looked for next to the script
+EXCLUSION_RULES_FILE = 'exclusion_rules.json'
+
+# Names containing any of these (in any case) are placeholder or cancelled records, not real staff
+DEFAULT_EXCLUDED_NAME_KEYWORDS = ('DNR', 'CANCELLED', 'XXX')
+
+
+class ExclusionRules:
+    """Which work-area rows to leave out: name keywords, name regexes and employee codes.
+
+    Keywords and regexes are compiled once into a single case-insensitive pattern, which
+    is run once per distinct name - the result is spread back over the rows by the
+    names' codes, so a name is never tested twice.
+    """
+
+    def __init__(self, keywords=DEFAULT_EXCLUDED_NAME_KEYWORDS, patterns=(), employee_codes=()):
+        self.keywords = tuple(str(keyword) for keyword in keywords)
+        self.patterns = tuple(str(pattern) for pattern in patterns)
+        self.employee_codes = frozenset(str(code) for code in employee_codes)
+        alternatives = [re.escape(keyword) for keyword in self.keywords] + [f"(?:{p})" for p in self.patterns]
+        self.name_pattern = re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def __eq__(self, other):
+        return (isinstance(other, ExclusionRules) and
+                (self.keywords, self.patterns, self.employee_codes) ==
+                (other.keywords, other.patterns, other.employee_codes))
+
+    def __hash__(self):
+        return hash((self.keywords, self.patterns, self.employee_codes))
+
+    def fingerprint(self):
+        """The rules as stable text, for keying caches built with them."""
+        return json.dumps([self.keywords, self.patterns, sorted(self.employee_codes)])
+
+    def excludes(self, name, emp_code=None):
+        """Check a single employee against the rules."""
+        if emp_code is not None and str(emp_code) in self.employee_codes:
+            return True
+        return bool(self.name_pattern and self.name_pattern.search(str(name)))
+
+    def mask(self, df):
+        """Boolean array marking the rows of df (Employee_Code, Employee_Name) to leave out."""
+        excluded = np.zeros(len(df), dtype=bool)
+        if self.name_pattern is not None and len(df):
+            name_codes, names = pd.factorize(df['Employee_Name'], use_na_sentinel=False)
+            excluded_names = pd.Series(names, dtype=object).astype(str).str.contains(self.name_pattern)
+            excluded |= excluded_names.to_numpy(dtype=bool)[name_codes]
+        if self.employee_codes:
+            excluded |= df['Employee_Code'].astype(str).isin(self.employee_codes).to_numpy()
+        return excluded
+
+    @classmethod
+    def load(cls, path=None):
+        """Load the rules file, falling back to the default keywords.
+
+        The file is a JSON object with any of
+            {"keywords": ["DNR", "CANCELLED", "XXX"],
+             "patterns": ["^TEST\\\\b"],
+             "employee_codes": ["99999"]}
+        where keywords and patterns are matched anywhere in the name, ignoring case.
+        """
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding='utf-8') as f:
+                config = json.load(f)
+            return cls(config.get('keywords', DEFAULT_EXCLUDED_NAME_KEYWORDS), config.get('patterns', ()),
+                       config.get('employee_codes', ()))
+        except (OSError, ValueError, AttributeError, re.error) as e:
+            print(f"Error reading exclusion rules {path}: {e} - using the default name keywords")
+            return cls()
@@ -1,24 +1,96 @@
+import hashlib
 import os
 import warnings
 from tkinter import Tk, messagebox
 
 import pandas as pd
 
-from scripts.employee_manager import EmployeeManager
+from scripts.employee_manager import LEAVE_COLUMNS, WORK_AREA_COLUMNS, EmployeeManager, load_status_codes
+from scripts.exclusion_rules import ExclusionRules
 
 # Suppress the specific warning about header/footer parsing
 warnings.filterwarnings("ignore", message="Cannot parse header or footer so it will be ignored")
 
 
+# Repeated text columns, stored as categoricals so each distinct value is held once
+CATEGORY_COLUMNS = ['Employee_Name', 'Shift_Type', 'Status', 'Employment_Type_Name', 'Location', 'Department', 'Role']
+TIME_COLUMNS = ['Start_Time', 'End_Time']
+# Format tried first for times exported as text; anything else falls back to pandas' own parsing
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# Long-running modes (watch, batch, server) report errors on the console instead of blocking on a popup
+SHOW_ERROR_POPUPS = True
+
+
+def set_error_popups(enabled):
+    """Enable or disable Tk error popups."""
+    global SHOW_ERROR_POPUPS
+    SHOW_ERROR_POPUPS = enabled
+
+
 def show_error_popup(message):
+    if not SHOW_ERROR_POPUPS:
+        print(message)
+        return
     root = Tk()
     root.withdraw()
     messagebox.showerror("Error", message)
     root.destroy()
 
 
+class LoadCache:
+    """Keep loaded DataFrames and the processed EmployeeManager between runs of the same process.
+
+    Files are keyed by path and fingerprint, so an export that hasn't changed is not
+    read again, and the EmployeeManager is reused while both exports are unchanged.
+    """
+
+    def __init__(self):
+        self.frames = {}
+        self.fingerprints = None
+        self.employee_manager = None
+
+    def get_frame(self, file_path):
+        entry = self.frames.get(file_path)
+        if entry is not None and entry[0] == file_fingerprint(file_path):
+            return entry[1], entry[2]
+        return None
+
+    def put_frame(self, file_path, fingerprint, df, file_type):
+        self.frames[file_path] = (fingerprint, df, file_type)
+
+
+def file_fingerprint(file_path):
+    """Cheap change detector for an input file: (size, modification time in ns)."""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def is_export_file(name):
+    """Whether a file name is an Excel export, skipping the lock files Excel keeps for open workbooks."""
+    return name.endswith(('.xlsx', '.xls')) and not name.startswith('~$')
+
+
+def exports_fingerprint(directory, window=None, exclusion_rules=None):
+    """Fingerprint of every export in directory (names, sizes, modification times), the window and the rules.
+
+    Used to tie caches derived from the exports to the exact files and exclusion rules
+    (the default name keywords when None) they were built from.
+    """
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(directory)):
+        if is_export_file(name):
+            size, mtime = file_fingerprint(os.path.join(directory, name))
+            digest.update(f"{name}|{size}|{mtime}\n".encode())
+    digest.update(repr(window).encode())
+    exclusion_rules = exclusion_rules if exclusion_rules is not None else ExclusionRules()
+    digest.update(exclusion_rules.fingerprint().encode())
+    return digest.hexdigest()
+
+
 def find_excel_files(directory):
-    excel_files = [f for f in os.listdir(directory) if f.endswith(('.xlsx', '.xls'))]
+    excel_files = [f for f in os.listdir(directory) if is_export_file(f)]
     if len(excel_files) != 2:
         show_error_popup(f"Error: Expected 2 Excel files, found {len(excel_files)}")
         return None, None
@@ -29,34 +101,94 @@ def validate_headers(df, headers):
     return all(header in df.columns for header in headers)
 
 
+def _parse_times(column):
+    """Parse a time column with TIME_FORMAT, only inferring the format for values that don't match."""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    parsed = pd.to_datetime(column, format=TIME_FORMAT, errors='coerce')
+    unmatched = parsed.isna() & column.notna()
+    if unmatched.any():
+        parsed[unmatched] = pd.to_datetime(column[unmatched].astype(str), errors='coerce')
+    return parsed
+
+
+def _compact_codes(column):
+    """Employee codes as the smallest integer type that holds them, or as a categorical if they aren't numeric."""
+    if pd.api.types.is_integer_dtype(column):
+        return pd.to_numeric(column, downcast='integer')
+    return column.astype(str).astype('category')
+
+
+def apply_schema(df, columns):
+    """Keep only columns, with repeated text as categoricals, parsed times and compact employee codes."""
+    df = df[columns].copy()
+    for column in columns:
+        if column in CATEGORY_COLUMNS:
+            df[column] = df[column].astype('category')
+        elif column in TIME_COLUMNS:
+            df[column] = _parse_times(df[column])
+        elif column == 'Employee_Code':
+            df[column] = _compact_codes(df[column])
+    return df
+
+
 def load_and_validate_data(file_path, leave_headers, work_areas_headers):
+    wanted = set(leave_headers) | set(work_areas_headers)
     try:
-        df = pd.read_excel(file_path)
-        print(f"Loaded: {os.path.basename(file_path)} ({len(df)} rows)")
+        # Only the columns either export is validated against are read into the frame
+        df = pd.read_excel(file_path, usecols=lambda column: column in wanted)
     except Exception as e:
         show_error_popup(f"Error loading {os.path.basename(file_path)}: {str(e)}")
         return None, ""
 
+    loaded_bytes = df.memory_usage(deep=True).sum()
     if validate_headers(df, leave_headers):
-        return df, "Employee Leave"
+        df, file_type = apply_schema(df, leave_headers), "Employee Leave"
     elif validate_headers(df, work_areas_headers):
-        return df, "Employee Work Areas"
+        df, file_type = apply_schema(df, work_areas_headers), "Employee Work Areas"
     else:
         show_error_popup(f"Error: {os.path.basename(file_path)} has invalid headers")
         return None, ""
 
+    print(f"Loaded: {os.path.basename(file_path)} ({len(df)} rows, "
+          f"{loaded_bytes / 1e6:.2f} MB as read, {df.memory_usage(deep=True).sum() / 1e6:.2f} MB typed)")
+    return df, file_type
+
+
+def _load_with_cache(file_path, fingerprint, leave_headers, work_areas_headers, cache):
+    """Load a file, reusing the cached DataFrame if the file hasn't changed since it was read."""
+    if cache is not None:
+        cached = cache.get_frame(file_path)
+        if cached is not None:
+            print(f"Unchanged: {os.path.basename(file_path)}")
+            return cached
 
-def load_employee_data(directory):
-    leave_headers = ['Employee_Code', 'Employee_Name', 'Shift_Type', 'Start_Time', 'End_Time', 'Status']
-    work_areas_headers = ['Employee_Code', 'Employee_Name', 'Employment_Type_Name', 'Location', 'Department', 'Role']
+    df, file_type = load_and_validate_data(file_path, leave_headers, work_areas_headers)
+    if cache is not None and df is not None:
+        cache.put_frame(file_path, fingerprint, df, file_type)
+    return df, file_type
+
+
+def load_employee_data(directory, cache=None, state_path=None, window=None, exclusion_rules=None,
+                       status_codes_path=None):
+    leave_headers = LEAVE_COLUMNS
+    work_areas_headers = WORK_AREA_COLUMNS
 
     print("\nProcessing Excel files...")
     file1, file2 = find_excel_files(directory)
     if not file1 or not file2:
         return None
 
-    df1, type1 = load_and_validate_data(file1, leave_headers, work_areas_headers)
-    df2, type2 = load_and_validate_data(file2, leave_headers, work_areas_headers)
+    exclusion_rules = exclusion_rules if exclusion_rules is not None else ExclusionRules()
+    fingerprints = (file_fingerprint(file1), file_fingerprint(file2))
+    cached_manager = cache.employee_manager if cache is not None else None
+    if (cached_manager is not None and cache.fingerprints == fingerprints and cached_manager.window == window
+            and cached_manager.exclusion_rules == exclusion_rules):
+        print("Exports unchanged - reusing processed employee data")
+        return cache.employee_manager.employees, cache.employee_manager
+
+    df1, type1 = _load_with_cache(file1, fingerprints[0], leave_headers, work_areas_headers, cache)
+    df2, type2 = _load_with_cache(file2, fingerprints[1], leave_headers, work_areas_headers, cache)
 
     if df1 is None or df2 is None:
         return None
@@ -69,8 +201,37 @@ def load_employee_data(directory):
         show_error_popup("Error: Unable to determine file types")
         return None
 
-    print("\nInitializing employee manager...")
-    employee_manager = EmployeeManager(leave_data=leave_data, work_areas_data=work_areas_data)
-    employee_manager.process_employees()
+    # Reuse the previous processed state if there is one, so only changed employees are rebuilt
+    employee_manager = cache.employee_manager if cache is not None else None
+    if employee_manager is None and state_path:
+        employee_manager = EmployeeManager.load_state(state_path)
+    if employee_manager is not None and employee_manager.exclusion_rules != exclusion_rules:
+        employee_manager = None  # Different rules can change any employee, so start over
+
+    if employee_manager is not None:
+        print("\nUpdating employee manager from previous state...")
+        changed = employee_manager.apply_update(leave_data, work_areas_data, window=window)
+        print(f"Rebuilt {len(changed)} changed employees")
+    else:
+        print("\nInitializing employee manager...")
+        employee_manager = EmployeeManager(leave_data=leave_data, work_areas_data=work_areas_data, window=window,
+                                           exclusion_rules=exclusion_rules,
+                                           status_codes=load_status_codes(status_codes_path))
+        employee_manager.process_employees()
+
+    if state_path:
+        try:
+            employee_manager.save_state(state_path)
+        except OSError as e:
+            print(f"Warning: Could not save employee state: {e}")
+    if status_codes_path:
+        try:
+            employee_manager.leave_status_manager.save_codes(status_codes_path)
+        except OSError as e:
+            print(f"Warning: Could not save status codes: {e}")
+
+    if cache is not None:
+        cache.fingerprints = fingerprints
+        cache.employee_manager = employee_manager
 
     return employee_manager.employees, employee_manager  # Return both the employees and the manager
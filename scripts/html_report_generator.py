@@ -0,0 +1,195 @@
+import os
+from datetime import datetime
+from html import escape
+
+from scripts.departmental_leave_report_generator import DepartmentalLeaveReportGenerator
+from scripts.employee_leave_report_generator import LeaveReportGenerator
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: Calibri, Arial, sans-serif; font-size: 13px; margin: 0; }}
+nav {{ position: sticky; top: 0; background: #f4f4f4; padding: 6px 10px; border-bottom: 1px solid #999; z-index: 3; }}
+nav a {{ margin-right: 12px; }}
+h2 {{ margin: 18px 10px 6px; }}
+.sheet {{ overflow: auto; max-height: 85vh; margin: 0 10px; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #999; padding: 1px 4px; text-align: center; white-space: nowrap; min-width: 70px; }}
+thead th {{ background: #ccc; position: sticky; top: 0; z-index: 2; }}
+th.name, td.name {{ text-align: left; min-width: 200px; }}
+td.group {{ background: #ccc; font-weight: bold; vertical-align: middle; white-space: normal; }}
+tr.total td {{ background: #e6e6e6; font-weight: bold; }}
+tr.gap td {{ border: none; height: 10px; }}
+.block-start td, .block-start th {{ border-top: 2px solid #333; }}
+{status_styles}
+</style>
+</head>
+<body>
+<nav>{nav}</nav>
+"""
+
+PAGE_TAIL = "</body>\n</html>\n"
+
+
+class HtmlReportGenerator:
+    """Render the leave and departmental reports as static HTML pages.
+
+    Sheets keep the same layouts, colours, totals rows and heat-map shading as the
+    Excel generators, whose data helpers are reused, but each table row is written
+    straight to the file as a string - there is no per-cell object model to build.
+    """
+
+    def __init__(self, employees, employee_manager, location_groups=None):
+        self.leave_report = LeaveReportGenerator(employees, employee_manager, location_groups=location_groups)
+        self.departmental_report = DepartmentalLeaveReportGenerator(employees, employee_manager,
+                                                                    location_groups=location_groups)
+        self.employee_manager = employee_manager
+        self.status_manager = employee_manager.leave_status_manager
+        # CSS class per status code
+        self.status_classes = [None] + [f"s{code - 1}" for code in range(1, len(self.status_manager.code_colors))]
+
+    def _status_styles(self):
+        codes = sorted(self.status_manager.codes[status] for status in self.status_manager.statuses)
+        return "\n".join(f".{self.status_classes[code]} {{ background: #{self.status_manager.code_colors[code]}; }}"
+                         for code in codes)
+
+    def _write_page_head(self, f, title, sheet_names):
+        nav = "".join(f'<a href="#sheet-{i}">{escape(name)}</a>' for i, name in enumerate(sheet_names))
+        f.write(PAGE_HEAD.format(title=escape(title), status_styles=self._status_styles(), nav=nav))
+
+    def _date_headers(self, all_dates):
+        return "".join(f"<th>{self.leave_report._format_date_header(date)}</th>" for date in all_dates)
+
+    def _leave_by_date(self, employee, all_dates):
+        """Map each rendered date to the employee's status code, expanding only the rendered columns."""
+        first, last = all_dates[0].toordinal(), all_dates[-1].toordinal()
+        statuses = {}
+        for range_start, range_end, status_code in employee.leave_dates.code_ranges():
+            for ordinal in range(max(range_start, first), min(range_end, last) + 1):
+                statuses[ordinal] = status_code
+        return statuses
+
+    def _write_employee_sheet(self, f, index, sheet_name, filtered_employees, location, all_dates):
+        """Same layout as LeaveReportGenerator._generate_worksheet."""
+        report = self.leave_report
+        ordinals = [date.toordinal() for date in all_dates]
+        f.write(f'<h2 id="sheet-{index}">{escape(sheet_name)}</h2>\n<div class="sheet"><table>\n<thead><tr>'
+                f'<th class="name">Employee Name (Code)</th><th>Employment Type</th><th>Leave Count</th>'
+                f'{self._date_headers(all_dates)}</tr></thead>\n<tbody>\n')
+
+        for emp_code, employee in sorted(filtered_employees.items(), key=lambda x: x[1].name):
+            statuses = self._leave_by_date(employee, all_dates) if all_dates else {}
+            cells = []
+            for ordinal in ordinals:
+                status_code = statuses.get(ordinal)
+                if status_code is None:
+                    cells.append("<td></td>")
+                else:
+                    cells.append(f'<td class="{self.status_classes[status_code]}">'
+                                 f'{escape(report.status_initials[status_code])}</td>')
+            f.write(f'<tr><td class="name">{escape(f"{employee.name} ({emp_code})")}</td>'
+                    f'<td>{escape(str(employee.employment_type))}</td><td>{len(employee.leave_dates)}</td>'
+                    f'{"".join(cells)}</tr>\n')
+        f.write('<tr class="gap"><td></td></tr>\n')
+
+        # Department table with heat-map shading, as _add_department_leave_table
+        department_counts = report._get_department_employee_counts(location)
+        departments = report._get_departments_for_location(location)
+        on_leave = {dept: [0] * len(all_dates) for dept in departments}
+        for employee in filtered_employees.values():
+            statuses = self._leave_by_date(employee, all_dates) if all_dates else {}
+            employee_departments = {area.department for area in employee.work_areas}
+            for col, ordinal in enumerate(ordinals):
+                if ordinal in statuses:
+                    for dept in employee_departments:
+                        if dept in on_leave:
+                            on_leave[dept][col] += 1
+
+        f.write(f'<tr class="block-start"><th colspan="2" class="name">Department</th><th>Employees</th>'
+                f'{self._date_headers(all_dates)}</tr>\n')
+        for dept in departments:
+            total_employees = department_counts[dept]
+            cells = []
+            for count in on_leave[dept]:
+                color = report._get_color_for_ratio(count, total_employees)
+                if count > 0 and color:
+                    cells.append(f'<td style="background:#{color}">{count}</td>')
+                elif count > 0:
+                    cells.append(f"<td>{count}</td>")
+                else:
+                    cells.append("<td></td>")
+            f.write(f'<tr><td colspan="2" class="name">{escape(str(dept))}</td><td>{total_employees}</td>'
+                    f'{"".join(cells)}</tr>\n')
+        f.write("</tbody></table></div>\n")
+
+    def _write_stacked_blocks(self, f, blocks, all_dates):
+        """Write name stacks per date with a totals row, as the departmental sheets do."""
+        report = self.departmental_report
+        first_block = True
+        for block_name, block_employees in blocks:
+            if not first_block:
+                f.write('<tr class="gap"><td></td></tr>\n')
+            first_block = False
+
+            employees_by_date = [report._get_employees_by_date(block_employees, date) for date in all_dates]
+            max_employees_per_day = max((len(emps) for emps in employees_by_date), default=0)
+            if max_employees_per_day == 0:
+                continue
+
+            for row_offset in range(max_employees_per_day):
+                cells = []
+                if row_offset == 0:
+                    cells.append(f'<td class="group" rowspan="{max_employees_per_day + 1}">'
+                                 f'{escape(str(block_name))}</td>')
+                for emps_on_leave in employees_by_date:
+                    if row_offset < len(emps_on_leave):
+                        emp, status_code = emps_on_leave[row_offset]
+                        cells.append(f'<td class="{self.status_classes[status_code]}">'
+                                     f'{escape(report._format_employee_name(emp.name))}</td>')
+                    else:
+                        cells.append("<td></td>")
+                row_class = ' class="block-start"' if row_offset == 0 else ''
+                f.write(f'<tr{row_class}>{"".join(cells)}</tr>\n')
+
+            totals = "".join(f"<td>{len(emps) if emps else ''}</td>" for emps in employees_by_date)
+            f.write(f'<tr class="total">{totals}</tr>\n')
+
+    def _write_departmental_sheet(self, f, index, sheet_name, location_employees, all_dates):
+        """Same layout as the departmental GLOBAL (by location) and location (by department) sheets."""
+        blocks = self.departmental_report._get_blocks(location_employees)
+        f.write(f'<h2 id="sheet-{index}">{escape(sheet_name)}</h2>\n<div class="sheet"><table>\n'
+                f'<thead><tr><th></th>{self._date_headers(all_dates)}</tr></thead>\n<tbody>\n')
+        self._write_stacked_blocks(f, blocks, all_dates)
+        f.write("</tbody></table></div>\n")
+
+    def save_reports(self, directory):
+        """Write both reports as HTML pages into directory."""
+        current_date = datetime.now()
+        month_year = current_date.strftime("%d %b %Y")
+        all_dates = self.leave_report._get_all_leave_dates()
+
+        filename = f"Leave Report {month_year}.html"
+        targets = self.leave_report._get_sheet_targets()
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+            self._write_page_head(f, filename[:-5], [name for name, _, _ in targets])
+            for index, (sheet_name, filtered_employees, location) in enumerate(targets):
+                self._write_employee_sheet(f, index, sheet_name, filtered_employees, location, all_dates)
+            f.write(PAGE_TAIL)
+        print(f"Saved: {filename}")
+
+        filename = f"Departmental Leave Report {month_year}.html"
+        targets = self.departmental_report._get_sheet_targets()
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+            self._write_page_head(f, filename[:-5], [name for name, _ in targets])
+            for index, (sheet_name, location_employees) in enumerate(targets):
+                self._write_departmental_sheet(f, index, sheet_name, location_employees, all_dates)
+            f.write(PAGE_TAIL)
+        print(f"Saved: {filename}")
+
+
+def generate_html_reports(employees, output_directory, employee_manager, location_groups=None):
+    """Main function to generate and save both reports as HTML."""
+    HtmlReportGenerator(employees, employee_manager, location_groups).save_reports(output_directory)
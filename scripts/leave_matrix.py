@@ -0,0 +1,152 @@
+import json
+import os
+import shutil
+from datetime import date
+
+import numpy as np
+
+
+class LeaveMatrix:
+    """Columnar copy of the processed leave data: an employee x date status matrix plus code tables.
+
+    status_codes[i, j] is 0 when employee i isn't on leave on dates[j], otherwise their
+    status's LeaveStatusManager code, which is its index + 1 in statuses.
+
+    Work areas are a separate table (one row per employee work area) of integer codes
+    into the locations, departments and roles tables, so every array is a plain
+    fixed-width NumPy array. That lets the matrix be saved as .npy files and mapped back
+    zero-copy by later runs or worker processes instead of rebuilding or pickling the
+    Employee graph.
+    """
+
+    VERSION = 2
+    METADATA_FILE = 'metadata.json'
+    ARRAY_NAMES = ('emp_codes', 'names', 'employment_type_codes', 'employment_types', 'dates', 'status_codes',
+                   'statuses', 'area_employee', 'area_location', 'area_department', 'area_role',
+                   'locations', 'departments', 'roles')
+
+    def __init__(self, **arrays):
+        for name in self.ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def from_employee_manager(cls, employee_manager):
+        """Build the matrix from a processed EmployeeManager."""
+        employees = list(employee_manager.employees.values())
+        # Codes are the manager's own, so statuses lists every status ever coded, in code order
+        statuses = employee_manager.leave_status_manager.code_statuses[1:]
+
+        window = employee_manager.window
+        if window is not None:
+            first, last = window[0].toordinal(), window[1].toordinal()
+        else:
+            ordinals = [ordinal for emp in employees
+                        for range_start, range_end, _ in emp.leave_dates.ordinal_ranges()
+                        for ordinal in (range_start, range_end)]
+            first, last = (min(ordinals), max(ordinals)) if ordinals else (1, 0)
+
+        day_count = max(0, last - first + 1)
+        code_type = np.int8 if len(statuses) < 127 else np.int16
+        status_codes = np.zeros((len(employees), day_count), dtype=code_type)
+        for row, emp in enumerate(employees):
+            for range_start, range_end, code in emp.leave_dates.code_ranges():
+                status_codes[row, max(range_start, first) - first:min(range_end, last) - first + 1] = code
+
+        employment_types, employment_type_codes = _encode([emp.employment_type for emp in employees])
+        areas = [(row, area) for row, emp in enumerate(employees) for area in emp.work_areas]
+        locations, area_location = _encode([area.location for _, area in areas])
+        departments, area_department = _encode([area.department for _, area in areas])
+        roles, area_role = _encode([area.role for _, area in areas])
+
+        start = np.datetime64(date.fromordinal(first), 'D') if day_count else np.datetime64('1970-01-01', 'D')
+        return cls(
+            emp_codes=_text_array([emp.emp_code for emp in employees]),
+            names=_text_array([emp.name for emp in employees]),
+            employment_type_codes=employment_type_codes,
+            employment_types=employment_types,
+            dates=start + np.arange(day_count),
+            status_codes=status_codes,
+            statuses=_text_array(statuses),
+            area_employee=np.array([row for row, _ in areas], dtype=np.int32),
+            area_location=area_location,
+            area_department=area_department,
+            area_role=area_role,
+            locations=locations,
+            departments=departments,
+            roles=roles,
+        )
+
+    @property
+    def shape(self):
+        return self.status_codes.shape
+
+    def date_index(self, day):
+        """Column of a date, or -1 if it is outside the matrix."""
+        if len(self.dates) == 0:
+            return -1
+        index = int((np.datetime64(day, 'D') - self.dates[0]).astype(int))
+        return index if 0 <= index < len(self.dates) else -1
+
+    def leave_date_columns(self):
+        """Indexes of the dates on which anyone is on leave - the columns the reports render."""
+        return np.flatnonzero(self.status_codes.any(axis=0))
+
+    def to_date(self, column):
+        return self.dates[column].astype(object)
+
+    def save(self, directory, fingerprint):
+        """Write every array as .npy next to a metadata file, replacing any previous matrix."""
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        temp_dir = directory + '.tmp'
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        for name in self.ARRAY_NAMES:
+            np.save(os.path.join(temp_dir, name + '.npy'), np.asarray(getattr(self, name)), allow_pickle=False)
+        with open(os.path.join(temp_dir, self.METADATA_FILE), 'w') as f:
+            json.dump({'version': self.VERSION, 'fingerprint': fingerprint,
+                       'shape': list(self.shape), 'arrays': list(self.ARRAY_NAMES)}, f, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(temp_dir, directory)
+
+    @classmethod
+    def load(cls, directory, fingerprint=None):
+        """Map a saved matrix read-only, or return None if it is missing, outdated or for other inputs."""
+        try:
+            with open(os.path.join(directory, cls.METADATA_FILE)) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if metadata.get('version') != cls.VERSION:
+            return None
+        if fingerprint is not None and metadata.get('fingerprint') != fingerprint:
+            return None
+        try:
+            arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r', allow_pickle=False)
+                      for name in cls.ARRAY_NAMES}
+        except (OSError, ValueError):
+            return None
+        return cls(**arrays)
+
+    @classmethod
+    def load_or_build(cls, directory, fingerprint, employee_manager):
+        """Map the saved matrix if it matches fingerprint, otherwise build it and save it for next time."""
+        matrix = cls.load(directory, fingerprint)
+        if matrix is None:
+            matrix = cls.from_employee_manager(employee_manager)
+            try:
+                matrix.save(directory, fingerprint)
+            except OSError as e:
+                print(f"Warning: Could not save leave matrix cache: {e}")
+        return matrix
+
+
+def _text_array(values):
+    """Fixed-width unicode array (object arrays can't be memory-mapped)."""
+    return np.array(['' if value is None or value != value else str(value) for value in values], dtype=str)
+
+
+def _encode(values):
+    """Dictionary-encode values into (sorted unique values, int32 codes)."""
+    uniques, codes = np.unique(_text_array(values), return_inverse=True)
+    return uniques, codes.astype(np.int32)
@@ -0,0 +1,111 @@
+from datetime import date
+
+import numpy as np
+
+from scripts.leave_matrix import LeaveMatrix
+
+
+class LeaveQuery:
+    """Answer "who is off" questions from a LeaveMatrix using prebuilt indexes.
+
+    Each location, department and role value maps to the work-area rows that have it,
+    and each employment type and status to its integer code, all built once. A query
+    is then a few array intersections plus one slice of the status matrix, instead of
+    a scan over every Employee's leave and work areas.
+    """
+
+    def __init__(self, leave_matrix):
+        self.matrix = leave_matrix
+        self.employee_count = len(leave_matrix.emp_codes)
+        self._area_index = {
+            'location': _value_index(leave_matrix.locations, leave_matrix.area_location),
+            'department': _value_index(leave_matrix.departments, leave_matrix.area_department),
+            'role': _value_index(leave_matrix.roles, leave_matrix.area_role),
+        }
+        self._employment_type_index = _value_index(leave_matrix.employment_types,
+                                                   leave_matrix.employment_type_codes)
+        self._status_codes = {str(status): code for code, status in enumerate(leave_matrix.statuses, 1)}
+        self._area_employee = np.asarray(leave_matrix.area_employee)
+
+    @classmethod
+    def from_employee_manager(cls, employee_manager):
+        return cls(LeaveMatrix.from_employee_manager(employee_manager))
+
+    def _employee_rows(self, location=None, department=None, role=None, employment_type=None):
+        """Rows of the employees matching the filters (location/department/role on the same work area)."""
+        areas = None
+        for field, value in (('location', location), ('department', department), ('role', role)):
+            if value is None:
+                continue
+            matches = self._area_index[field].get(value, _EMPTY)
+            areas = matches if areas is None else np.intersect1d(areas, matches, assume_unique=True)
+        if areas is None:
+            rows = np.arange(self.employee_count)
+        else:
+            rows = np.unique(self._area_employee[areas])
+        if employment_type is not None:
+            rows = np.intersect1d(rows, self._employment_type_index.get(employment_type, _EMPTY), assume_unique=True)
+        return rows
+
+    def _columns(self, start, end):
+        """Matrix column slice covering start..end (inclusive), clipped to the matrix dates."""
+        dates = self.matrix.dates
+        if len(dates) == 0:
+            return slice(0, 0)
+        first = int((np.datetime64(start, 'D') - dates[0]).astype(int))
+        last = int((np.datetime64(end, 'D') - dates[0]).astype(int))
+        return slice(max(first, 0), max(min(last + 1, len(dates)), 0))
+
+    def who_is_off(self, start, end=None, location=None, department=None, role=None, status=None,
+                   employment_type=None):
+        """Get the employees on leave on a date, or on any day of start..end (inclusive).
+
+        Returns a list of dicts sorted by name, each with emp_code, name, employment_type
+        and days - a list of (date, status) for the days the employee is off in the range.
+        """
+        end = end or start
+        rows = self._employee_rows(location, department, role, employment_type)
+        columns = self._columns(start, end)
+        codes = np.asarray(self.matrix.status_codes[rows, columns])
+        if status is not None:
+            off = codes == self._status_codes.get(status, -1)
+        else:
+            off = codes != 0
+
+        hit_rows, hit_columns = np.nonzero(off)
+        results = {}
+        for row, column in zip(rows[hit_rows], hit_columns + columns.start):
+            entry = results.get(row)
+            if entry is None:
+                entry = results[row] = {
+                    'emp_code': str(self.matrix.emp_codes[row]),
+                    'name': str(self.matrix.names[row]),
+                    'employment_type': str(self.matrix.employment_types[self.matrix.employment_type_codes[row]]),
+                    'days': [],
+                }
+            day = self.matrix.dates[column].astype(date)
+            entry['days'].append((day, str(self.matrix.statuses[self.matrix.status_codes[row, column] - 1])))
+        return sorted(results.values(), key=lambda entry: entry['name'])
+
+    def count_off(self, start, end=None, location=None, department=None, role=None, status=None,
+                  employment_type=None):
+        """Get the number of matching employees on leave per day as a list of (date, count)."""
+        end = end or start
+        rows = self._employee_rows(location, department, role, employment_type)
+        columns = self._columns(start, end)
+        codes = np.asarray(self.matrix.status_codes[rows, columns])
+        off = codes == self._status_codes.get(status, -1) if status is not None else codes != 0
+        counts = off.sum(axis=0)
+        return [(self.matrix.dates[column].astype(date), int(count))
+                for column, count in zip(range(columns.start, columns.stop), counts)]
+
+
+_EMPTY = np.array([], dtype=np.int64)
+
+
+def _value_index(values, codes):
+    """Map each value in a code table to the sorted rows carrying its code."""
+    codes = np.asarray(codes)
+    order = np.argsort(codes, kind='stable')
+    boundaries = np.searchsorted(codes[order], np.arange(len(values) + 1))
+    return {str(value): order[boundaries[code]:boundaries[code + 1]] for code, value in enumerate(values)}
@@ -0,0 +1,251 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+
+from scripts.workbook_saver import WorkbookSaver
+
+ROLLUP_PERIODS = {
+    'week': ('W-SUN', 'Weekly'),
+    'month': ('M', 'Monthly'),
+}
+
+
+def rollup_buckets(dates, period):
+    """Group consecutive matrix dates into week (Monday start) or month buckets.
+
+    Returns (bucket start column per bucket, bucket label per bucket, days per bucket).
+    """
+    if len(dates) == 0:
+        return np.array([], dtype=np.int64), [], np.array([], dtype=np.int64)
+    periods = pd.DatetimeIndex(np.asarray(dates)).to_period(ROLLUP_PERIODS[period][0])
+    period_codes = periods.asi8
+    starts = np.flatnonzero(np.concatenate(([True], period_codes[1:] != period_codes[:-1])))
+    days = np.diff(np.append(starts, len(dates)))
+    if period == 'week':
+        labels = [f"W/C {periods[i].start_time:%d/%m/%y}" for i in starts]
+    else:
+        labels = [f"{periods[i].start_time:%b %Y}" for i in starts]
+    return starts, labels, days
+
+
+def ratio_color(value, total):
+    """Hex colour for value out of total, shading from white (none) to red (all), or None for none.
+
+    This is the department heat-map shading of the leave report; every output that
+    shades a count or rate uses it so they read the same.
+    """
+    if total == 0 or value == 0:
+        return None
+    intensity = int(min(value / total, 1) * 255)
+    return f"ff{255 - intensity:02x}{255 - intensity:02x}"
+
+
+def employee_days_by_bucket(leave_matrix, starts):
+    """Days on leave per employee per bucket (employees x buckets)."""
+    on_leave = np.asarray(leave_matrix.status_codes) != 0
+    if on_leave.shape[1] == 0:
+        return np.zeros((on_leave.shape[0], 0), dtype=np.int64)
+    return np.add.reduceat(on_leave.astype(np.int32), starts, axis=1)
+
+
+def _group_membership(group_keys, area_employee, employee_count):
+    """Group the work areas' employees by key: (sorted keys, member rows by key, offset of each key's first member).
+
+    An employee with several work areas under the same key is a member once.
+    """
+    groups, group_index = np.unique(group_keys, return_inverse=True)
+    pairs = np.unique(group_index.astype(np.int64) * employee_count + np.asarray(area_employee))
+    members = pairs % employee_count
+    offsets = np.searchsorted(pairs // employee_count, np.arange(len(groups)))
+    return groups, members, offsets
+
+
+def department_membership(leave_matrix):
+    """Which employees belong to each location/department.
+
+    Returns (list of (location, department, headcount), member employee rows grouped by
+    location/department, offset of each group's first member). An employee with several
+    roles in a department counts once.
+    """
+    m = leave_matrix
+    department_count = max(len(m.departments), 1)
+    group_keys = np.asarray(m.area_location, dtype=np.int64) * department_count + np.asarray(m.area_department)
+    groups, members, offsets = _group_membership(group_keys, m.area_employee, len(m.emp_codes))
+    headcounts = np.diff(np.append(offsets, len(members)))
+    rows = [(str(m.locations[key // department_count]), str(m.departments[key % department_count]), int(headcount))
+            for key, headcount in zip(groups, headcounts)]
+    return rows, members, offsets
+
+
+def location_membership(leave_matrix):
+    """Which employees work at each location.
+
+    Returns (list of (location, headcount), member employee rows grouped by location,
+    offset of each location's first member), as department_membership does.
+    """
+    m = leave_matrix
+    groups, members, offsets = _group_membership(np.asarray(m.area_location, dtype=np.int64), m.area_employee,
+                                                 len(m.emp_codes))
+    headcounts = np.diff(np.append(offsets, len(members)))
+    rows = [(str(m.locations[key]), int(headcount)) for key, headcount in zip(groups, headcounts)]
+    return rows, members, offsets
+
+
+def sum_by_department(per_employee, members, offsets):
+    """Add up the rows of an employees x dates array per location/department (groups x dates).
+
+    members and offsets can come from location_membership too, giving one row per location.
+    Only the members' rows are gathered, so the cost follows the number of work areas
+    rather than employees x departments.
+    """
+    if per_employee.shape[1] == 0 or len(offsets) == 0:
+        return np.zeros((len(offsets), per_employee.shape[1]), dtype=np.int64)
+    return np.add.reduceat(per_employee[members], offsets, axis=0, dtype=np.int64)
+
+
+def department_daily_absence(leave_matrix):
+    """Employees on leave per location/department per day.
+
+    Returns (list of (location, department, headcount), daily count array) with one row
+    per location/department and one column per matrix date.
+    """
+    rows, members, offsets = department_membership(leave_matrix)
+    return rows, sum_by_department(np.asarray(leave_matrix.status_codes) != 0, members, offsets)
+
+
+def department_absence_by_bucket(leave_matrix, starts, days):
+    """Peak and average concurrent absence per location/department per bucket.
+
+    Returns (list of (location, department, headcount), peak array, average array),
+    with one row per location/department and one column per bucket.
+    """
+    rows, daily_counts = department_daily_absence(leave_matrix)
+    if daily_counts.shape[1] == 0:
+        empty = np.zeros((len(rows), 0))
+        return rows, empty, empty
+    peak = np.maximum.reduceat(daily_counts, starts, axis=1)
+    average = np.add.reduceat(daily_counts, starts, axis=1) / days
+    return rows, peak, average
+
+
+class RollupReportGenerator:
+    """Weekly or monthly roll-up of the leave matrix: one column per bucket instead of per day."""
+
+    def __init__(self, leave_matrix, period='week'):
+        self.matrix = leave_matrix
+        self.period = period
+        self.wb = Workbook()
+        self.header_fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+        self.thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'),
+                                  bottom=Side(style='thin'))
+
+    def _write_header_cell(self, ws, row, col, header):
+        cell = ws.cell(row=row, column=col)
+        cell.value = header
+        cell.font = Font(bold=True)
+        cell.fill = self.header_fill
+        cell.alignment = Alignment(horizontal='center', wrap_text=True)
+        cell.border = self.thin_border
+
+    def _write_header(self, ws, row, headers):
+        for col, header in enumerate(headers, 1):
+            self._write_header_cell(ws, row, col, header)
+
+    def _write_value(self, ws, row, col, value, color=None):
+        cell = ws.cell(row=row, column=col)
+        if value:
+            cell.value = value
+        if color:
+            cell.fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = self.thin_border
+
+    def _generate_employee_sheet(self, starts, labels, days):
+        m = self.matrix
+        ws = self.wb.create_sheet('Employees')
+        self._write_header(ws, 1, ['Employee Name (Code)', 'Employment Type', 'Locations', 'Days Off'] + labels)
+
+        days_by_bucket = employee_days_by_bucket(m, starts)
+        totals = days_by_bucket.sum(axis=1)
+        locations_by_employee = {}
+        for employee, location in zip(np.asarray(m.area_employee), np.asarray(m.area_location)):
+            locations_by_employee.setdefault(int(employee), set()).add(str(m.locations[location]))
+
+        names = np.asarray(m.names)
+        row = 2
+        for employee in sorted(np.flatnonzero(totals), key=lambda i: names[i]):
+            ws.cell(row=row, column=1).value = f"{names[employee]} ({m.emp_codes[employee]})"
+            ws.cell(row=row, column=2).value = str(m.employment_types[m.employment_type_codes[employee]])
+            ws.cell(row=row, column=3).value = ", ".join(sorted(locations_by_employee.get(int(employee), ())))
+            ws.cell(row=row, column=4).value = int(totals[employee])
+            for col, (value, bucket_days) in enumerate(zip(days_by_bucket[employee], days), 5):
+                self._write_value(ws, row, col, int(value), ratio_color(value, bucket_days))
+            row += 1
+
+        for col, width in enumerate([30, 16, 30, 9], 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        for col in range(5, len(labels) + 5):
+            ws.column_dimensions[get_column_letter(col)].width = 12
+        ws.freeze_panes = 'E2'
+
+    def _generate_department_sheet(self, starts, labels, days):
+        ws = self.wb.create_sheet('Departments')
+        rows, peak, average = department_absence_by_bucket(self.matrix, starts, days)
+
+        # Bucket label spans its Peak and Avg columns
+        self._write_header(ws, 1, ['Location', 'Department', 'Employees'])
+        self._write_header(ws, 2, [None, None, None])
+        for index, label in enumerate(labels):
+            col = 4 + index * 2
+            self._write_header_cell(ws, 1, col, label)
+            self._write_header_cell(ws, 1, col + 1, None)
+            ws.merge_cells(start_row=1, start_column=col, end_row=1, end_column=col + 1)
+            self._write_header_cell(ws, 2, col, 'Peak')
+            self._write_header_cell(ws, 2, col + 1, 'Avg')
+
+        for row, (location, department, headcount) in enumerate(rows, 3):
+            ws.cell(row=row, column=1).value = location
+            ws.cell(row=row, column=2).value = department
+            ws.cell(row=row, column=3).value = headcount
+            for index in range(len(labels)):
+                col = 4 + index * 2
+                peak_value = int(peak[row - 3, index])
+                self._write_value(ws, row, col, peak_value, ratio_color(peak_value, headcount))
+                self._write_value(ws, row, col + 1, round(float(average[row - 3, index]), 1))
+
+        for col, width in enumerate([30, 20, 10], 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        for col in range(4, len(labels) * 2 + 4):
+            ws.column_dimensions[get_column_letter(col)].width = 9
+        ws.freeze_panes = 'D3'
+
+    def generate_report(self):
+        """Generate the roll-up workbook."""
+        starts, labels, days = rollup_buckets(self.matrix.dates, self.period)
+
+        # Remove default sheet if it exists
+        if 'Sheet' in self.wb.sheetnames:
+            self.wb.remove(self.wb['Sheet'])
+
+        self._generate_employee_sheet(starts, labels, days)
+        self._generate_department_sheet(starts, labels, days)
+
+    def save_report(self, directory, saver=None):
+        """Save the report with the specified naming convention, through saver (a WorkbookSaver) if given."""
+        current_date = datetime.now()
+        month_year = current_date.strftime("%d %b %Y")
+        filename = f"{ROLLUP_PERIODS[self.period][1]} Leave Rollup {month_year}.xlsx"
+        filepath = os.path.join(directory, filename)
+        (saver or WorkbookSaver()).save(self.wb, filepath)
+
+
+def generate_rollup_report(leave_matrix, output_directory, period='week', saver=None):
+    """Main function to generate and save a weekly or monthly roll-up report."""
+    report_generator = RollupReportGenerator(leave_matrix, period)
+    report_generator.generate_report()
+    report_generator.save_report(output_directory, saver)
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+from datetime import date, datetime
+
+from scripts.employee_manager import Employee, EmployeeManager, WorkArea
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    window_start TEXT,
+    window_end TEXT,
+    source_fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS employees (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    emp_code TEXT NOT NULL,
+    name TEXT,
+    employment_type TEXT,
+    PRIMARY KEY (snapshot_id, emp_code)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS work_areas (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    emp_code TEXT NOT NULL,
+    location TEXT,
+    department TEXT,
+    role TEXT
+);
+CREATE TABLE IF NOT EXISTS leave_days (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    emp_code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT,
+    shift_type TEXT,
+    PRIMARY KEY (snapshot_id, emp_code, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS leave_days_by_date ON leave_days (date, snapshot_id, emp_code);
+CREATE INDEX IF NOT EXISTS leave_days_by_snapshot_date ON leave_days (snapshot_id, date);
+CREATE INDEX IF NOT EXISTS work_areas_by_location ON work_areas (location, department, snapshot_id, emp_code);
+CREATE INDEX IF NOT EXISTS work_areas_by_employee ON work_areas (snapshot_id, emp_code);
+"""
+
+
+def _to_text(value):
+    """Store missing values from the exports (NaN) as NULL."""
+    if value is None or value != value:
+        return None
+    return str(value)
+
+
+class LeaveStore:
+    """Local SQLite history of processed exports.
+
+    Each processed export is written as a snapshot with normalized employee,
+    work-area and leave-day tables. Leave days are indexed by date and work areas
+    by location and department, so history queries across many snapshots stay fast,
+    and any snapshot can be turned back into an EmployeeManager for the generators.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write_snapshot(self, employee_manager):
+        """Write the processed employees as a new snapshot and return its id.
+
+        An export that was already stored (same rows and window) isn't written twice.
+        """
+        fingerprint = employee_manager.source_fingerprint()
+        if fingerprint is not None:
+            row = self.connection.execute(
+                'SELECT id FROM snapshots WHERE source_fingerprint = ? ORDER BY id DESC LIMIT 1',
+                (fingerprint,)).fetchone()
+            if row:
+                return row[0]
+
+        window = employee_manager.window
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO snapshots (created_at, window_start, window_end, source_fingerprint) VALUES (?, ?, ?, ?)',
+                (datetime.now().isoformat(timespec='seconds'),
+                 window[0].isoformat() if window else None,
+                 window[1].isoformat() if window else None,
+                 fingerprint))
+            snapshot_id = cursor.lastrowid
+            employees = employee_manager.employees.values()
+            self.connection.executemany(
+                'INSERT INTO employees VALUES (?, ?, ?, ?)',
+                ((snapshot_id, emp.emp_code, _to_text(emp.name), _to_text(emp.employment_type))
+                 for emp in employees))
+            self.connection.executemany(
+                'INSERT INTO work_areas VALUES (?, ?, ?, ?, ?)',
+                ((snapshot_id, emp.emp_code, _to_text(area.location), _to_text(area.department), _to_text(area.role))
+                 for emp in employees for area in emp.work_areas))
+            self.connection.executemany(
+                'INSERT INTO leave_days VALUES (?, ?, ?, ?, ?)',
+                ((snapshot_id, emp.emp_code, date.fromordinal(ordinal).isoformat(), _to_text(status), _to_text(shift_type))
+                 for emp in employees
+                 for start, end, status, shift_type in emp.leave_dates.intervals()
+                 for ordinal in range(start.toordinal(), end.toordinal() + 1)))
+        return snapshot_id
+
+    def list_snapshots(self):
+        """Get (id, created_at, window_start, window_end) for every stored snapshot, oldest first."""
+        return self.connection.execute(
+            'SELECT id, created_at, window_start, window_end FROM snapshots ORDER BY id').fetchall()
+
+    def latest_snapshot_id(self):
+        row = self.connection.execute('SELECT MAX(id) FROM snapshots').fetchone()
+        return row[0]
+
+    def load_employee_manager(self, snapshot_id=None, status_codes=()):
+        """Rebuild an EmployeeManager from a snapshot (the latest by default), or None if there isn't one.
+
+        status_codes are statuses in code order from earlier runs, as for EmployeeManager.
+        """
+        if snapshot_id is None:
+            snapshot_id = self.latest_snapshot_id()
+        snapshot = self.connection.execute(
+            'SELECT window_start, window_end FROM snapshots WHERE id = ?', (snapshot_id,)).fetchone()
+        if snapshot is None:
+            return None
+
+        window = None
+        if snapshot[0] and snapshot[1]:
+            window = (date.fromisoformat(snapshot[0]), date.fromisoformat(snapshot[1]))
+
+        employee_manager = EmployeeManager(leave_data=None, work_areas_data=None, window=window,
+                                           status_codes=status_codes)
+        status_manager = employee_manager.leave_status_manager
+        status_manager.add_codes([status for status, in self.connection.execute(
+            'SELECT DISTINCT status FROM leave_days WHERE snapshot_id = ?', (snapshot_id,))])
+
+        employees = {}
+        for emp_code, name, employment_type in self.connection.execute(
+                'SELECT emp_code, name, employment_type FROM employees WHERE snapshot_id = ?', (snapshot_id,)):
+            employees[emp_code] = Employee(emp_code, name, employment_type)
+
+        for emp_code, location, department, role in self.connection.execute(
+                'SELECT emp_code, location, department, role FROM work_areas WHERE snapshot_id = ?',
+                (snapshot_id,)):
+            employees[emp_code].add_work_area(WorkArea(location, department, role))
+
+        # Days arrive in date order per employee, so each one extends the last interval
+        for emp_code, day, status, shift_type in self.connection.execute(
+                'SELECT emp_code, date, status, shift_type FROM leave_days WHERE snapshot_id = ? '
+                'ORDER BY emp_code, date', (snapshot_id,)):
+            leave_date = date.fromisoformat(day)
+            employees[emp_code].add_leave_date(leave_date, status, shift_type, status_manager.codes[status])
+
+        for employee in employees.values():
+            employee_manager.add_employee(employee)
+        employee_manager.leave_status_manager.assign_colors()
+        return employee_manager
+
+    def leave_days_between(self, start, end, location=None, department=None, snapshot_id=None):
+        """Get (date, emp_code, name, location, department, status) for leave between start and end.
+
+        Uses the latest snapshot unless snapshot_id is given. Pass snapshot_id='all' to
+        query across every snapshot, e.g. for year-over-year comparisons.
+        """
+        if snapshot_id is None:
+            snapshot_id = self.latest_snapshot_id()
+        query = ('SELECT DISTINCT l.date, l.emp_code, e.name, w.location, w.department, l.status '
+                 'FROM leave_days l '
+                 'JOIN work_areas w ON w.snapshot_id = l.snapshot_id AND w.emp_code = l.emp_code '
+                 'JOIN employees e ON e.snapshot_id = l.snapshot_id AND e.emp_code = l.emp_code '
+                 'WHERE l.date BETWEEN ? AND ?')
+        params = [start.isoformat(), end.isoformat()]
+        if snapshot_id != 'all':
+            query += ' AND l.snapshot_id = ?'
+            params.append(snapshot_id)
+        if location is not None:
+            query += ' AND w.location = ?'
+            params.append(location)
+        if department is not None:
+            query += ' AND w.department = ?'
+            params.append(department)
+        return self.connection.execute(query + ' ORDER BY l.date, e.name', params).fetchall()
@@ -0,0 +1,237 @@
+import numpy as np
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+
+from scripts.leave_rollup import (department_daily_absence, location_membership, ratio_color, rollup_buckets,
+                                 sum_by_department)
+
+SUMMARY_SHEET_NAME = 'Summary'
+
+# Departments listed in the summary's top absence table
+TOP_DEPARTMENT_COUNT = 10
+
+# Absence rate at which the summary's shading reaches full red
+FULL_SHADE_RATE = 0.25
+
+
+def employee_status_days_by_week(leave_matrix, starts):
+    """Days on leave per employee per week bucket per status (employees x buckets x statuses).
+
+    Counted with one bincount over the matrix's leave cells; status s is code s + 1.
+    """
+    codes = np.asarray(leave_matrix.status_codes)
+    employee_count, day_count = codes.shape
+    bucket_count, status_count = len(starts), len(leave_matrix.statuses)
+    if day_count == 0 or status_count == 0:
+        return np.zeros((employee_count, bucket_count, status_count), dtype=np.int64)
+    bucket_of_day = np.repeat(np.arange(bucket_count), np.diff(np.append(starts, day_count)))
+    rows, columns = np.nonzero(codes)
+    keys = ((rows.astype(np.int64) * bucket_count + bucket_of_day[columns]) * status_count +
+            codes[rows, columns].astype(np.int64) - 1)
+    return np.bincount(keys, minlength=employee_count * bucket_count * status_count).reshape(
+        employee_count, bucket_count, status_count)
+
+
+def top_departments(leave_matrix, count=TOP_DEPARTMENT_COUNT):
+    """The location/departments with the most employee-days on leave, most first.
+
+    Returns (location, department, headcount, leave days, rate, peak on leave) tuples, where
+    rate is the leave days over headcount x days covered.
+    """
+    rows, daily_counts = department_daily_absence(leave_matrix)
+    if not rows or daily_counts.shape[1] == 0:
+        return []
+    totals = daily_counts.sum(axis=1)
+    peaks = daily_counts.max(axis=1)
+    day_count = daily_counts.shape[1]
+    departments = []
+    for i in np.argsort(-totals, kind='stable')[:count]:
+        if totals[i] == 0:
+            break
+        location, department, headcount = rows[i]
+        departments.append((location, department, headcount, int(totals[i]),
+                            float(totals[i]) / (headcount * day_count), int(peaks[i])))
+    return departments
+
+
+class LeaveSummary:
+    """Headline figures for the summary sheet, pivoted from the leave matrix.
+
+    by_status[s, w] is the employee-days on leave with status s in week w, and
+    by_location[s, l, w] the same per location - an employee working at two locations
+    counts at both. location_rates[l, w] divides a location's days by its headcount x
+    the days in the week. Everything comes from one per-employee pivot, so the cost is a
+    few array passes whatever the number of sheets.
+    """
+
+    def __init__(self, leave_matrix, top_count=TOP_DEPARTMENT_COUNT):
+        m = leave_matrix
+        self.dates = np.asarray(m.dates)
+        self.starts, self.week_labels, self.week_days = rollup_buckets(m.dates, 'week')
+        self.statuses = [str(status) for status in m.statuses]
+
+        per_employee = employee_status_days_by_week(m, self.starts)
+        employee_count, week_count, status_count = per_employee.shape
+        self.employee_count = employee_count
+        self.employees_on_leave = int(per_employee.reshape(employee_count, -1).any(axis=1).sum())
+        self.by_status = per_employee.sum(axis=0).T
+
+        self.locations, members, offsets = location_membership(m)
+        by_location = sum_by_department(per_employee.reshape(employee_count, -1), members, offsets)
+        self.by_location = by_location.reshape(len(self.locations), week_count, status_count).transpose(2, 0, 1)
+        headcounts = np.array([headcount for _, headcount in self.locations], dtype=np.float64)
+        self.location_rates = self.by_location.sum(axis=0) / (headcounts[:, None] * self.week_days)
+
+        self.top_departments = top_departments(m, top_count)
+
+
+class _SummaryWriter:
+    def __init__(self, ws, status_colors):
+        self.ws = ws
+        self.status_colors = status_colors
+        self.header_fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+        self.thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'),
+                                  bottom=Side(style='thin'))
+
+    def rate_color(self, rate):
+        """Heat-map shading for a rate, full red at FULL_SHADE_RATE."""
+        return ratio_color(max(rate, 0), FULL_SHADE_RATE)
+
+    def title(self, row, text):
+        cell = self.ws.cell(row=row, column=1)
+        cell.value = text
+        cell.font = Font(bold=True, size=12)
+
+    def header(self, row, headers):
+        for col, header in enumerate(headers, 1):
+            cell = self.ws.cell(row=row, column=col)
+            cell.value = header
+            cell.font = Font(bold=True)
+            cell.fill = self.header_fill
+            cell.alignment = Alignment(horizontal='center', wrap_text=True)
+            cell.border = self.thin_border
+
+    def value(self, row, col, value, number_format=None, color=None, bold=False):
+        cell = self.ws.cell(row=row, column=col)
+        if value is not None and value != 0:
+            cell.value = value
+        if number_format:
+            cell.number_format = number_format
+        if color:
+            cell.fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+        if bold:
+            cell.font = Font(bold=True)
+        cell.border = self.thin_border
+
+    def status(self, row, col, index, name):
+        code = index + 1
+        color = self.status_colors[code] if code < len(self.status_colors) else None
+        self.value(row, col, name, color=color)
+
+    def rate(self, row, col, rate, bold=False):
+        self.value(row, col, round(float(rate), 4), '0.0%', self.rate_color(rate), bold)
+
+
+def add_summary_sheet(wb, summary, status_colors, index=0):
+    """Add the summary sheet to wb at position index.
+
+    It holds leave days by status and week, by location, status and week with absence
+    rates, and the departments with the most leave. status_colors is indexed by status
+    code, as LeaveStatusManager.code_colors is.
+    """
+    ws = wb.create_sheet(SUMMARY_SHEET_NAME, index)
+    writer = _SummaryWriter(ws, status_colors)
+    weeks = summary.week_labels
+    first_week_col = 4
+
+    cell = ws.cell(row=1, column=1)
+    cell.value = 'Leave Summary'
+    cell.font = Font(bold=True, size=14)
+    if len(summary.dates):
+        first, last = (np.datetime64(day, 'D').item() for day in (summary.dates[0], summary.dates[-1]))
+        ws.cell(row=2, column=1).value = (f"{first:%d/%m/%Y} to {last:%d/%m/%Y}: {summary.employees_on_leave} of "
+                                          f"{summary.employee_count} employees have leave")
+
+    # Leave days by status and week
+    row = 4
+    writer.title(row, 'Leave days by status')
+    writer.header(row + 1, ['Status', None, None] + weeks + ['Total'])
+    row += 2
+    for status_index, name in enumerate(summary.statuses):
+        days = summary.by_status[status_index]
+        if not days.any():
+            continue
+        writer.status(row, 1, status_index, name)
+        for col, value in enumerate(days, first_week_col):
+            writer.value(row, col, int(value))
+        writer.value(row, first_week_col + len(weeks), int(days.sum()), bold=True)
+        row += 1
+    writer.value(row, 1, 'Total', bold=True)
+    for col, value in enumerate(summary.by_status.sum(axis=0), first_week_col):
+        writer.value(row, col, int(value), bold=True)
+    writer.value(row, first_week_col + len(weeks), int(summary.by_status.sum()), bold=True)
+
+    # Leave days by location, status and week, with the share of the location's headcount off
+    row += 3
+    writer.title(row, 'Leave days by location')
+    writer.header(row + 1, ['Location', 'Status', 'Employees'] + weeks + ['Total', 'Rate'])
+    row += 2
+    total_days = max(int(np.sum(summary.week_days)), 1)
+    for location_index, (location, headcount) in enumerate(summary.locations):
+        days = summary.by_location[:, location_index, :]
+        if not days.any():
+            continue
+        writer.value(row, 1, location, bold=True)
+        writer.value(row, 2, 'All', bold=True)
+        writer.value(row, 3, headcount)
+        for col, (value, rate) in enumerate(zip(days.sum(axis=0), summary.location_rates[location_index]),
+                                            first_week_col):
+            writer.value(row, col, int(value), color=writer.rate_color(rate), bold=True)
+        writer.value(row, first_week_col + len(weeks), int(days.sum()), bold=True)
+        writer.rate(row, first_week_col + len(weeks) + 1, days.sum() / (headcount * total_days), bold=True)
+        row += 1
+        for status_index, name in enumerate(summary.statuses):
+            if not days[status_index].any():
+                continue
+            writer.value(row, 1, location)
+            writer.status(row, 2, status_index, name)
+            writer.value(row, 3, None)
+            for col, value in enumerate(days[status_index], first_week_col):
+                writer.value(row, col, int(value))
+            writer.value(row, first_week_col + len(weeks), int(days[status_index].sum()))
+            writer.rate(row, first_week_col + len(weeks) + 1, days[status_index].sum() / (headcount * total_days))
+            row += 1
+
+    # Absence rate per location per week
+    row += 2
+    writer.title(row, 'Absence rate by location (leave days / employees x days)')
+    writer.header(row + 1, ['Location', None, 'Employees'] + weeks)
+    row += 2
+    for location_index, (location, headcount) in enumerate(summary.locations):
+        if not summary.by_location[:, location_index, :].any():
+            continue
+        writer.value(row, 1, location)
+        writer.value(row, 3, headcount)
+        for col, rate in enumerate(summary.location_rates[location_index], first_week_col):
+            writer.rate(row, col, rate)
+        row += 1
+
+    # Departments with the most absence
+    row += 2
+    writer.title(row, f"Top {len(summary.top_departments)} departments by leave days")
+    writer.header(row + 1, ['Location', 'Department', 'Employees', 'Leave Days', 'Rate', 'Peak On Leave'])
+    row += 2
+    for location, department, headcount, leave_days, rate, peak in summary.top_departments:
+        writer.value(row, 1, location)
+        writer.value(row, 2, department)
+        writer.value(row, 3, headcount)
+        writer.value(row, 4, leave_days)
+        writer.rate(row, 5, rate)
+        writer.value(row, 6, peak)
+        row += 1
+
+    for col, width in enumerate([30, 20, 11], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    for col in range(first_week_col, first_week_col + len(weeks) + 2):
+        ws.column_dimensions[get_column_letter(col)].width = 11
+    return ws
@@ -0,0 +1,98 @@
+import json
+import os
+
+# Location groups file looked for next to the script
+LOCATION_GROUPS_FILE = 'location_groups.json'
+
+# Groups used when there is no location groups file - each gets its own combined sheet
+DEFAULT_LOCATION_GROUPS = {
+    "ADELAIDE HILLS & STRATHALBYN": ["ADELAIDE HILLS", "STRATHALBYN"],
+}
+
+
+def resolve_location_groups(groups):
+    """Expand nested groups into (group name, tuple of locations) pairs, in config order.
+
+    groups maps a group name to its members; a member naming another group stands for
+    all of that group's locations. Raises ValueError if groups contain each other.
+    """
+    resolved = {}
+
+    def expand(name, path):
+        if name in resolved:
+            return resolved[name]
+        if name in path:
+            raise ValueError(f"Location group '{name}' contains itself via {' -> '.join(path + [name])}")
+        locations = []
+        for member in groups[name]:
+            member = str(member)
+            for location in (expand(member, path + [name]) if member in groups else (member,)):
+                if location not in locations:
+                    locations.append(location)
+        resolved[name] = tuple(locations)
+        return resolved[name]
+
+    return [(str(name), expand(name, [])) for name in groups]
+
+
+def load_location_groups(path=None):
+    """Load and resolve the location groups file, falling back to DEFAULT_LOCATION_GROUPS.
+
+    The file is a JSON object mapping each group name to a list of locations and/or
+    other group names, e.g.
+        {"ADELAIDE HILLS & STRATHALBYN": ["ADELAIDE HILLS", "STRATHALBYN"],
+         "SOUTH": ["ADELAIDE HILLS & STRATHALBYN", "VICTOR HARBOR"]}
+    """
+    if not path or not os.path.exists(path):
+        return resolve_location_groups(DEFAULT_LOCATION_GROUPS)
+    try:
+        with open(path, encoding='utf-8') as f:
+            groups = json.load(f)
+        if not isinstance(groups, dict) or not all(isinstance(members, list) for members in groups.values()):
+            raise ValueError("expected an object mapping each group name to a list of members")
+        return resolve_location_groups(groups)
+    except (OSError, ValueError) as e:
+        print(f"Error reading location groups {path}: {e} - using the default groups")
+        return resolve_location_groups(DEFAULT_LOCATION_GROUPS)
+
+
+class LocationIndex:
+    """Employee codes per location and per location/department, built in one pass over the employees.
+
+    A group's employees or departments are unions of its locations' sets, so a combined
+    sheet doesn't need another scan of every employee.
+    """
+
+    def __init__(self, employees):
+        self.order = {}
+        self.employees_by_location = {}
+        self.department_members = {}
+        for position, (emp_code, employee) in enumerate(employees.items()):
+            self.order[emp_code] = position
+            for area in employee.work_areas:
+                self.employees_by_location.setdefault(area.location, set()).add(emp_code)
+                self.department_members.setdefault(area.location, {}).setdefault(
+                    area.department, set()).add(emp_code)
+
+    @staticmethod
+    def locations_of(location):
+        """Locations covered by a location name or a (group name, locations) pair."""
+        return location[1] if isinstance(location, tuple) else (location,)
+
+    def locations(self):
+        return sorted(self.employees_by_location)
+
+    def employee_codes(self, location):
+        """Codes of the employees working at the location or any location of the group, in employee order."""
+        codes = set()
+        for name in self.locations_of(location):
+            codes |= self.employees_by_location.get(name, set())
+        return sorted(codes, key=self.order.__getitem__)
+
+    def department_counts(self, location):
+        """Unique employee count per department at the location or group."""
+        members = {}
+        for name in self.locations_of(location):
+            for dept, codes in self.department_members.get(name, {}).items():
+                members.setdefault(dept, set()).update(codes)
+        return {dept: len(codes) for dept, codes in members.items()}
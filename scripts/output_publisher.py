@@ -0,0 +1,163 @@
+import os
+import shutil
+import time
+from datetime import datetime
+
+
+def safe_remove_directory(directory):
+    """Safely remove a directory and its contents with error handling."""
+    if not os.path.exists(directory):
+        return
+
+    try:
+        shutil.rmtree(directory)
+    except PermissionError:
+        try:
+            for root, dirs, files in os.walk(directory):
+                for file in files:
+                    try:
+                        file_path = os.path.join(root, file)
+                        os.unlink(file_path)
+                    except Exception:
+                        pass
+
+            for root, dirs, files in os.walk(directory, topdown=False):
+                for dir_name in dirs:
+                    try:
+                        dir_path = os.path.join(root, dir_name)
+                        os.rmdir(dir_path)
+                    except Exception:
+                        pass
+
+            try:
+                os.rmdir(directory)
+            except Exception:
+                pass
+        except Exception:
+            print("Warning: Directory cleanup incomplete - continuing with existing directory...")
+
+
+class OutputPublisher:
+    """Render reports into a staging folder and swap it into place when complete.
+
+    The staging folder lives next to the final output folder so the swap is a
+    rename on the same filesystem. Readers of the output folder therefore only
+    ever see the previous complete set of reports or the new complete set,
+    never a half-written one. Replaced generations are kept as
+    '<folder>.previous-<timestamp>' and pruned down to `keep_generations`.
+    Staging folders left behind by crashed runs are pruned once they are a day old;
+    younger ones may belong to another run still rendering into the same base folder.
+    """
+
+    STAGING_MARKER = '.staging-'
+    PREVIOUS_MARKER = '.previous-'
+    # Staging folders untouched for this long are treated as left over from a crashed run
+    STALE_STAGING_SECONDS = 24 * 60 * 60
+
+    def __init__(self, base_dir, folder_name, keep_generations=1):
+        self.base_dir = base_dir
+        self.folder_name = folder_name
+        self.output_dir = os.path.join(base_dir, folder_name)
+        self.keep_generations = max(0, keep_generations)
+        self.staging_dir = None
+        # Reports the last publish couldn't replace in place, e.g. because they were open
+        self.unreplaced_files = []
+
+    def _timestamp(self):
+        return datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+
+    def _sibling_dirs(self, marker):
+        """Get sibling folders created by earlier runs for this output folder, oldest first."""
+        prefix = self.folder_name + marker
+        try:
+            names = [name for name in os.listdir(self.base_dir)
+                     if name.startswith(prefix) and os.path.isdir(os.path.join(self.base_dir, name))]
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.base_dir, name) for name in sorted(names)]
+
+    def stage(self):
+        """Create a fresh staging folder and return its path."""
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.staging_dir = os.path.join(self.base_dir, self.folder_name + self.STAGING_MARKER + self._timestamp())
+        os.makedirs(self.staging_dir)
+        return self.staging_dir
+
+    def publish(self):
+        """Swap the staging folder into place and prune old generations.
+
+        If the output folder can't be moved, its files are replaced one by one, and any
+        that can't be are listed in unreplaced_files.
+        """
+        if self.staging_dir is None:
+            raise RuntimeError("Nothing staged to publish")
+        self.unreplaced_files = []
+
+        previous_dir = None
+        if os.path.exists(self.output_dir):
+            previous_dir = os.path.join(self.base_dir,
+                                        self.folder_name + self.PREVIOUS_MARKER + self._timestamp())
+            try:
+                os.rename(self.output_dir, previous_dir)
+            except OSError:
+                # Usually a report is still open in Excel, so the folder can't be moved.
+                # Fall back to replacing the files one by one.
+                self.unreplaced_files = self._replace_files_in_place()
+                self.prune()
+                return self.output_dir
+
+        try:
+            os.rename(self.staging_dir, self.output_dir)
+        except OSError:
+            if previous_dir is not None:
+                os.rename(previous_dir, self.output_dir)
+            raise
+
+        self.staging_dir = None
+        self.prune()
+        return self.output_dir
+
+    def _replace_files_in_place(self):
+        """Move staged files over the existing output folder, skipping any that are locked.
+
+        Returns the names of the files that couldn't be replaced. Their new versions are
+        left in the staging folder, which is otherwise removed.
+        """
+        unreplaced = []
+        for name in sorted(os.listdir(self.staging_dir)):
+            try:
+                os.replace(os.path.join(self.staging_dir, name), os.path.join(self.output_dir, name))
+            except OSError:
+                unreplaced.append(name)
+        if unreplaced:
+            print(f"Warning: Could not replace {', '.join(unreplaced)} - is it open in another program? "
+                  f"The new versions are in {self.staging_dir}")
+        else:
+            safe_remove_directory(self.staging_dir)
+        self.staging_dir = None
+        return unreplaced
+
+    def discard(self):
+        """Remove the staging folder after a failed run, leaving the published output untouched."""
+        if self.staging_dir is not None:
+            safe_remove_directory(self.staging_dir)
+            self.staging_dir = None
+
+    def prune(self):
+        """Remove previous generations beyond the retention policy and stale staging folders."""
+        previous_dirs = self._sibling_dirs(self.PREVIOUS_MARKER)
+        expired = previous_dirs[:len(previous_dirs) - self.keep_generations] if self.keep_generations else previous_dirs
+        cutoff = time.time() - self.STALE_STAGING_SECONDS
+        stale_staging = [path for path in self._sibling_dirs(self.STAGING_MARKER)
+                         if path != self.staging_dir and _last_modified(path) < cutoff]
+        for directory in expired + stale_staging:
+            safe_remove_directory(directory)
+
+
+def _last_modified(directory):
+    """Latest modification time of a folder or anything directly in it, or 0 if it has gone."""
+    try:
+        with os.scandir(directory) as entries:
+            return max([os.path.getmtime(directory)] + [entry.stat().st_mtime for entry in entries])
+    except OSError:
+        return 0
@@ -0,0 +1,193 @@
+import csv
+import os
+from datetime import datetime, timedelta
+
+from scripts.absence_forecast import generate_rolling_absence_report
+from scripts.coverage_analysis import generate_coverage_report
+from scripts.data_export import export_leave_data
+from scripts.employee_manager import load_status_codes
+from scripts.file_loader import exports_fingerprint, load_employee_data
+from scripts.html_report_generator import generate_html_reports
+from scripts.leave_matrix import LeaveMatrix
+from scripts.leave_rollup import generate_rollup_report
+from scripts.leave_store import LeaveStore
+from scripts.output_publisher import OutputPublisher
+from scripts.table_workbook import generate_table_workbook
+from scripts.workbook_saver import DEFAULT_COMPRESS_LEVEL, WorkbookSaver
+from scripts.employee_leave_report_generator import generate_leave_report
+from scripts.departmental_leave_report_generator import generate_departmental_leave_report
+
+# Number of replaced report folders to keep from earlier runs on the same day
+KEEP_PREVIOUS_GENERATIONS = 1
+
+# Folder next to the script holding state carried between runs
+CACHE_DIR_NAME = 'Cache'
+EMPLOYEE_STATE_FILE = 'employee_state.pkl'
+LEAVE_HISTORY_FILE = 'leave_history.sqlite'
+LEAVE_MATRIX_DIR = 'leave_matrix'
+STATUS_CODES_FILE = 'status_codes.json'
+
+# Default reporting horizon in days either side of today - leave outside it is dropped at load
+REPORT_DAYS_BEFORE = 14
+REPORT_DAYS_AFTER = 120
+
+
+def report_window(days_before=REPORT_DAYS_BEFORE, days_after=REPORT_DAYS_AFTER, today=None):
+    """Get the (start date, end date) reporting window around today."""
+    today = today or datetime.now().date()
+    return today - timedelta(days=days_before), today + timedelta(days=days_after)
+
+
+def default_store_path(base_dir):
+    """Get the default location of the SQLite leave history store."""
+    return os.path.join(base_dir, CACHE_DIR_NAME, LEAVE_HISTORY_FILE)
+
+
+def latest_snapshot_id(store_path):
+    """Id of the newest snapshot in the store, or None if there is no store or snapshot yet."""
+    if not os.path.exists(store_path):
+        return None
+    with LeaveStore(store_path) as store:
+        return store.latest_snapshot_id()
+
+
+def load_from_store(store_path, snapshot_id=None, status_codes_path=None):
+    """Load a stored snapshot (the latest by default) as (employees, employee_manager), or None."""
+    if not os.path.exists(store_path):
+        print(f"Error: No leave history store at {store_path}")
+        return None
+    with LeaveStore(store_path) as store:
+        employee_manager = store.load_employee_manager(snapshot_id, load_status_codes(status_codes_path))
+    if employee_manager is None:
+        print("Error: Snapshot not found in the leave history store.")
+        return None
+    return employee_manager.employees, employee_manager
+
+
+def list_store_snapshots(store_path):
+    """Print the snapshots in the leave history store, oldest first."""
+    if not os.path.exists(store_path):
+        print(f"Error: No leave history store at {store_path}")
+        return
+    with LeaveStore(store_path) as store:
+        snapshots = store.list_snapshots()
+    if not snapshots:
+        print("The leave history store has no snapshots yet.")
+    for snapshot_id, created_at, window_start, window_end in snapshots:
+        window = f"{window_start} to {window_end}" if window_start and window_end else "full horizon"
+        print(f"{snapshot_id:>6}  {created_at[:19].replace('T', ' ')}  {window}")
+
+
+def export_stored_leave(store_path, start, end, output_directory, snapshot_id='all'):
+    """Write the stored leave days between start and end to a CSV file in output_directory.
+
+    Covers every snapshot by default so history older than the latest export is
+    included; pass None for the latest snapshot only, or a snapshot id.
+    """
+    if not os.path.exists(store_path):
+        print(f"Error: No leave history store at {store_path}")
+        return None
+    with LeaveStore(store_path) as store:
+        rows = store.leave_days_between(start, end, snapshot_id=snapshot_id)
+    path = os.path.join(output_directory, f"Leave History {start:%d %b %Y} to {end:%d %b %Y}.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'Employee Code', 'Name', 'Location', 'Department', 'Status'])
+        writer.writerows(rows)
+    print(f"Saved: {os.path.basename(path)} ({len(rows)} leave days)")
+    return path
+
+
+def run_report_pipeline(reports_dir, base_dir, cache=None, horizon=(REPORT_DAYS_BEFORE, REPORT_DAYS_AFTER),
+                        store_path=None, from_store=False, snapshot_id=None, export_data=False, skip_xlsx=False,
+                        html=False, rollup=None, cell_budget=None, coverage=None, rolling_window=None,
+                        location_groups=None, exclusion_rules=None, table_workbook=False,
+                        compress_level=DEFAULT_COMPRESS_LEVEL, background_save=False):
+    """Load the exports in reports_dir, render both reports and publish them under base_dir.
+
+    horizon is (days before, days after) today to report on, or None to report every leave date.
+    If store_path is given each processed export is also written to that SQLite history
+    store; with from_store the reports are rendered from a stored snapshot instead of the exports.
+    export_data also writes the long-format leave tables (CSV/Parquet) for BI tools, and
+    skip_xlsx leaves out the styled workbooks, and html adds static HTML versions of both reports.
+    rollup ('week' or 'month') adds a roll-up workbook with one column per week or month.
+    cell_budget splits workbook sheets by date so none holds more than that many cells.
+    coverage is a thresholds file path; when given, understaffed department days are listed too.
+    rolling_window (days) adds each department's peak absence over every window of that length.
+    location_groups are the (group name, locations) pairs given combined sheets, None for the defaults.
+    exclusion_rules (an ExclusionRules) pick the employees left out, None for the default name keywords.
+    table_workbook adds a workbook holding the leave data as one Excel Table plus summary sheets.
+    compress_level is the zlib level of the workbooks (0 stores them uncompressed), and with
+    background_save each workbook is saved on a worker thread while the next one renders.
+    Returns the published output folder, or None if the exports couldn't be loaded.
+    """
+    # Create date-specific folder name
+    current_date = datetime.now()
+    folder_name = current_date.strftime("Leave Report %d %b %Y")
+
+    # Load employee data
+    status_codes_path = os.path.join(base_dir, CACHE_DIR_NAME, STATUS_CODES_FILE)
+    if from_store:
+        store_path = store_path or default_store_path(base_dir)
+        # Key the matrix on the snapshot actually loaded, so a newer snapshot isn't served from an old matrix
+        if snapshot_id is None:
+            snapshot_id = latest_snapshot_id(store_path)
+        employee_data = load_from_store(store_path, snapshot_id, status_codes_path)
+        fingerprint = f"store:{store_path}:{snapshot_id}"
+    else:
+        window = report_window(*horizon) if horizon is not None else None
+        if window is not None:
+            print(f"Reporting window: {window[0]:%d %b %Y} to {window[1]:%d %b %Y}")
+        fingerprint = exports_fingerprint(reports_dir, window, exclusion_rules)
+
+        state_path = os.path.join(base_dir, CACHE_DIR_NAME, EMPLOYEE_STATE_FILE)
+        # This returns a tuple of (employees, employee_manager)
+        employee_data = load_employee_data(reports_dir, cache=cache, state_path=state_path, window=window,
+                                           exclusion_rules=exclusion_rules, status_codes_path=status_codes_path)
+
+    if employee_data is None:
+        print("Error: Failed to load employee data.")
+        return None
+
+    employees, employee_manager = employee_data  # Unpack the tuple
+    print(f"Processed {len(employees)} employees")
+
+    if store_path and not from_store:
+        with LeaveStore(store_path) as store:
+            print(f"Stored as history snapshot {store.write_snapshot(employee_manager)}")
+
+    # Columnar copy of the leave data for other stages and worker processes to map
+    matrix_dir = os.path.join(base_dir, CACHE_DIR_NAME, LEAVE_MATRIX_DIR)
+    leave_matrix = LeaveMatrix.load_or_build(matrix_dir, fingerprint, employee_manager)
+    print(f"Leave matrix: {leave_matrix.shape[0]} employees x {leave_matrix.shape[1]} days")
+
+    # Render into a staging folder so the published folder is never half-written
+    publisher = OutputPublisher(base_dir, folder_name, keep_generations=KEEP_PREVIOUS_GENERATIONS)
+    output_dir = publisher.stage()
+
+    # Generate reports - pass both employees and employee_manager to both generators
+    try:
+        # Leaving the block waits for any workbook still saving in the background
+        with WorkbookSaver(compress_level, background_save) as saver:
+            if export_data:
+                export_leave_data(leave_matrix, output_dir)
+            if rollup:
+                generate_rollup_report(leave_matrix, output_dir, rollup, saver)
+            if coverage is not None:
+                generate_coverage_report(leave_matrix, output_dir, coverage, saver)
+            if rolling_window:
+                generate_rolling_absence_report(leave_matrix, output_dir, rolling_window, saver)
+            if table_workbook:
+                generate_table_workbook(leave_matrix, output_dir, saver)
+            if html:
+                generate_html_reports(employees, output_dir, employee_manager, location_groups)
+            if not skip_xlsx:
+                generate_leave_report(employees, output_dir, employee_manager, cell_budget, location_groups,
+                                      leave_matrix, saver)
+                generate_departmental_leave_report(employees, output_dir, employee_manager, cell_budget,
+                                                   location_groups, saver)
+    except Exception:
+        publisher.discard()
+        raise
+
+    return publisher.publish()
@@ -0,0 +1,208 @@
+import csv
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from openpyxl import Workbook
+
+from scripts.departmental_leave_report_generator import DepartmentalLeaveReportGenerator
+from scripts.employee_leave_report_generator import LeaveReportGenerator
+from scripts.file_loader import LoadCache, exports_fingerprint, load_employee_data, set_error_popups
+from scripts.leave_query import LeaveQuery
+from scripts.report_pipeline import REPORT_DAYS_AFTER, REPORT_DAYS_BEFORE, report_window
+
+REPORT_GENERATORS = {
+    'leave': LeaveReportGenerator,
+    'departmental': DepartmentalLeaveReportGenerator,
+}
+
+CONTENT_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json; charset=utf-8',
+}
+
+
+class ReportModel:
+    """Processed exports held in memory, with an LRU cache of rendered sheets.
+
+    Before every request the exports are fingerprinted (a stat per file) together with
+    the reporting window, which is worked out from horizon (days before, days after
+    today, or None for every date) each time so it moves on at midnight. When either
+    changes the data is reloaded - incrementally, through the same LoadCache and state
+    as the pipeline - and every cached render is dropped.
+
+    The server holds the model's one lock for the whole of each request, so requests
+    are served one at a time and every request, read-only ones included, waits behind
+    a reload or a render in progress.
+    """
+
+    def __init__(self, reports_dir, horizon=(REPORT_DAYS_BEFORE, REPORT_DAYS_AFTER), state_path=None,
+                 cache_size=32, location_groups=None, exclusion_rules=None, status_codes_path=None):
+        self.reports_dir = reports_dir
+        self.horizon = horizon
+        self.state_path = state_path
+        self.status_codes_path = status_codes_path
+        self.location_groups = location_groups
+        self.exclusion_rules = exclusion_rules
+        self.cache_size = cache_size
+        self.load_cache = LoadCache()
+        self.fingerprint = None
+        self.employee_manager = None
+        self.leave_query = None
+        self.renders = OrderedDict()
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Reload the exports if they or the window changed. Returns False if they can't be loaded."""
+        window = report_window(*self.horizon) if self.horizon is not None else None
+        fingerprint = exports_fingerprint(self.reports_dir, window, self.exclusion_rules)
+        if fingerprint == self.fingerprint and self.employee_manager is not None:
+            return True
+        employee_data = load_employee_data(self.reports_dir, cache=self.load_cache, state_path=self.state_path,
+                                           window=window, exclusion_rules=self.exclusion_rules,
+                                           status_codes_path=self.status_codes_path)
+        if employee_data is None:
+            return False
+        self.employee_manager = employee_data[1]
+        self.leave_query = None
+        self.renders.clear()
+        self.fingerprint = fingerprint
+        return True
+
+    def _generator(self, report):
+        employee_manager = self.employee_manager
+        return REPORT_GENERATORS[report](employee_manager.employees, employee_manager,
+                                         location_groups=self.location_groups)
+
+    def sheet_names(self, report):
+        return self._generator(report).get_sheet_names()
+
+    def render(self, report, sheet_name, output_format):
+        """Render one sheet as bytes in output_format, or None if there is no such sheet."""
+        key = (report, sheet_name, output_format)
+        if key in self.renders:
+            self.renders.move_to_end(key)
+            return self.renders[key]
+
+        generator = self._generator(report)
+        created = generator.generate_sheet(sheet_name)
+        if not created:
+            return None
+        body = _serialize(generator.wb, [generator.wb[name] for name in created], output_format)
+
+        self.renders[key] = body
+        if len(self.renders) > self.cache_size:
+            self.renders.popitem(last=False)
+        return body
+
+    def who_is_off(self, start, end=None, **filters):
+        if self.leave_query is None:
+            self.leave_query = LeaveQuery.from_employee_manager(self.employee_manager)
+        return self.leave_query.who_is_off(start, end, **filters)
+
+
+def _serialize(wb, worksheets, output_format):
+    """Serialize a rendered sheet - the parts of a sheet split to fit Excel's limits follow one another."""
+    if output_format == 'xlsx':
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
+
+    rows = [['' if value is None else value for value in row]
+            for ws in worksheets for row in ws.iter_rows(values_only=True)]
+    if output_format == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+    return json.dumps({'sheet': worksheets[0].title, 'parts': [ws.title for ws in worksheets],
+                       'rows': rows}).encode('utf-8')
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """Routes:
+
+    /                                  -> JSON list of reports and their sheets
+    /report/<report>/<sheet>.<format>  -> one sheet as xlsx, csv or json
+    /who-is-off?date=YYYY-MM-DD[&end=YYYY-MM-DD][&location=..&department=..&role=..&status=..&employment_type=..]
+    """
+
+    model = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+        with self.model.lock:
+            if not self.model.refresh():
+                self._send(503, 'text/plain; charset=utf-8', b'Exports could not be loaded')
+                return
+            try:
+                if not parts:
+                    index = {report: self.model.sheet_names(report) for report in REPORT_GENERATORS}
+                    self._send_json(index)
+                elif parts[0] == 'report' and len(parts) == 3:
+                    self._send_report(parts[1], parts[2])
+                elif parts == ['who-is-off']:
+                    self._send_who_is_off(parse_qs(url.query))
+                else:
+                    self._send(404, 'text/plain; charset=utf-8', b'Not found')
+            except ValueError as e:
+                self._send(400, 'text/plain; charset=utf-8', str(e).encode('utf-8'))
+
+    def _send_report(self, report, file_name):
+        sheet_name, _, output_format = file_name.rpartition('.')
+        if report not in REPORT_GENERATORS or output_format not in CONTENT_TYPES:
+            self._send(404, 'text/plain; charset=utf-8', b'Unknown report or format')
+            return
+        body = self.model.render(report, sheet_name, output_format)
+        if body is None:
+            self._send(404, 'text/plain; charset=utf-8', b'Unknown sheet')
+            return
+        self._send(200, CONTENT_TYPES[output_format], body)
+
+    def _send_who_is_off(self, query):
+        if 'date' not in query:
+            raise ValueError("Missing date parameter")
+        start = date.fromisoformat(query['date'][0])
+        end = date.fromisoformat(query['end'][0]) if 'end' in query else None
+        filters = {name: query[name][0] for name in ('location', 'department', 'role', 'status', 'employment_type')
+                   if name in query}
+        results = self.model.who_is_off(start, end, **filters)
+        for entry in results:
+            entry['days'] = [(day.isoformat(), status) for day, status in entry['days']]
+        self._send_json(results)
+
+    def _send_json(self, data):
+        self._send(200, CONTENT_TYPES['json'], json.dumps(data).encode('utf-8'))
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_reports(reports_dir, port=8765, horizon=(REPORT_DAYS_BEFORE, REPORT_DAYS_AFTER), state_path=None,
+                  location_groups=None, exclusion_rules=None, status_codes_path=None):
+    """Serve on-demand sheet renders on localhost until interrupted with Ctrl+C.
+
+    horizon is (days before, days after) today to report on, or None for every leave date.
+    """
+    set_error_popups(False)
+    model = ReportModel(reports_dir, horizon=horizon, state_path=state_path, location_groups=location_groups,
+                        exclusion_rules=exclusion_rules, status_codes_path=status_codes_path)
+    handler = type('BoundReportRequestHandler', (ReportRequestHandler,), {'model': model})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    print(f"Serving reports on http://127.0.0.1:{port}/ (Ctrl+C to stop)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+    finally:
+        server.server_close()
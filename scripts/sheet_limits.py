@@ -0,0 +1,128 @@
+import re
+
+from openpyxl.styles import PatternFill, Font, Alignment
+from openpyxl.utils import get_column_letter
+
+# Hard limits of the xlsx format
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+MAX_SHEET_NAME_LENGTH = 31
+
+INVALID_SHEET_NAME_CHARACTERS = re.compile(r'[\[\]:*?/\\]')
+# The ' (2)' SheetNamer.name adds to a name that clashes with an earlier one
+CLASH_SUFFIX = re.compile(r' \((\d+)\)$')
+
+# Sheet listing the parts of any sheet that had to be split
+INDEX_SHEET_NAME = 'Index'
+
+
+class SheetNamer:
+    """Hand out valid, unique worksheet names.
+
+    Names are cleaned of characters Excel rejects and cut to 31 characters; a name
+    that would collide with one already handed out gets a ' (2)', ' (3)'... suffix,
+    cutting the base name further so the suffix always fits.
+    """
+
+    def __init__(self, reserved=()):
+        self.used = {name.lower() for name in reserved}
+
+    def name(self, wanted, suffix=''):
+        base = INVALID_SHEET_NAME_CHARACTERS.sub('_', str(wanted)).strip("'") or 'Sheet'
+        candidate = base[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+        counter = 2
+        while candidate.lower() in self.used:
+            numbered = f"{suffix} ({counter})"
+            candidate = base[:MAX_SHEET_NAME_LENGTH - len(numbered)] + numbered
+            counter += 1
+        self.used.add(candidate.lower())
+        return candidate
+
+    @staticmethod
+    def _cut(base, suffix):
+        return base[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+
+    def part_names(self, name, count):
+        """Names for the count parts a sheet called name is split into: 'GLOBAL (1)', 'GLOBAL (2)'...
+
+        A clash suffix the sheet's name already has stays ahead of the part number, so the
+        parts of 'LONG LOCATION (2)' are 'LONG LOCATION (2) (1)'... and never look like
+        parts of 'LONG LOCATION'; the rest of the name is cut so both fit. If any part name
+        is taken, the whole set moves to the next clash suffix no sheet goes by, so parts
+        share one prefix.
+        """
+        match = CLASH_SUFFIX.search(name)
+        base, clash = (name[:match.start()], int(match.group(1))) if match else (name, None)
+        while True:
+            prefix = '' if clash is None else f" ({clash})"
+            names = [self._cut(base, f"{prefix} ({part})") for part in range(1, count + 1)]
+            keys = {candidate.lower() for candidate in names}
+            if len(keys) == count and not keys & self.used:
+                self.used |= keys
+                return names
+            clash = 2 if clash is None else clash + 1
+            while self._cut(base, f" ({clash})").lower() in self.used:
+                clash += 1
+
+
+def chunk_sizes(total, per_chunk):
+    """Split range(total) into (start, stop) chunks of at most per_chunk items (at least one chunk)."""
+    per_chunk = max(1, per_chunk)
+    return [(start, min(start + per_chunk, total)) for start in range(0, max(total, 1), per_chunk)]
+
+
+def plan_date_shards(date_count, fixed_columns, row_count, cell_budget=None):
+    """Split the date columns so each sheet stays inside the column limit and the cell budget.
+
+    Returns a list of (start, stop) date index ranges - a single range when no split is needed.
+    """
+    max_dates = MAX_COLUMNS - fixed_columns
+    if cell_budget:
+        max_dates = min(max_dates, cell_budget // max(row_count, 1) - fixed_columns)
+    return chunk_sizes(date_count, max(max_dates, 1))
+
+
+def plan_row_shards(row_heights, header_rows, row_limit=MAX_ROWS):
+    """Group consecutive blocks of rows so each group stays inside row_limit.
+
+    row_heights is the number of rows each block takes. Returns (start, stop) block index
+    ranges. A block larger than the limit still gets a group of its own.
+    """
+    groups = []
+    start, used = 0, header_rows
+    for index, height in enumerate(row_heights):
+        if used + height > row_limit and index > start:
+            groups.append((start, index))
+            start, used = index, header_rows
+        used += height
+    groups.append((start, len(row_heights)))
+    return groups
+
+
+def add_index_sheet(wb, entries):
+    """Add an index as the first sheet, linking to every sheet with its source sheet and date range.
+
+    entries are (sheet name, source sheet name, first date, last date, rows) in sheet order.
+    """
+    ws = wb.create_sheet(INDEX_SHEET_NAME, 0)
+    headers = ['Sheet', 'Part Of', 'From', 'To', 'Rows']
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col)
+        cell.value = header
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+        cell.alignment = Alignment(horizontal='center')
+
+    for row, (sheet_name, source_name, first_date, last_date, rows) in enumerate(entries, 2):
+        cell = ws.cell(row=row, column=1)
+        cell.value = sheet_name
+        cell.hyperlink = f"#'{sheet_name}'!A1"
+        cell.font = Font(color='0563C1', underline='single')
+        ws.cell(row=row, column=2).value = source_name
+        ws.cell(row=row, column=3).value = first_date.strftime('%d/%m/%Y') if first_date else ''
+        ws.cell(row=row, column=4).value = last_date.strftime('%d/%m/%Y') if last_date else ''
+        ws.cell(row=row, column=5).value = rows
+
+    for col, width in enumerate([34, 34, 12, 12, 10], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    ws.freeze_panes = 'A2'
@@ -0,0 +1,232 @@
+import datetime
+import re
+from collections import namedtuple
+from io import BytesIO
+from xml.sax.saxutils import escape
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import Relationship, RelationshipList
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.worksheet._writer import WorksheetWriter
+from openpyxl.worksheet.dimensions import SheetDimension
+from openpyxl.writer.excel import ExcelWriter
+from openpyxl.xml.constants import ARC_SHARED_STRINGS, ARC_WORKBOOK_RELS, SHARED_STRINGS, SHEET_MAIN_NS
+from openpyxl.xml.functions import fromstring, tostring
+
+# Bytes of row XML gathered before each write into the zip stream
+STREAM_CHUNK_SIZE = 1 << 20
+
+ROW_TAG = re.compile(rb'<row r="(\d+)"')
+EMPTY_SHEET_DATA = re.compile(rb'<sheetData\s*/>')
+
+# Rows streamed into a sheet: rows yields (row number, cells XML) for rows first_row..last_row
+RowStream = namedtuple('RowStream', 'first_row last_row max_column rows')
+
+
+class SharedStrings:
+    """The workbook's shared strings table - each distinct text is written once and cells refer to it by index."""
+
+    def __init__(self):
+        self.index = {}
+
+    def add(self, text):
+        """Index of text in the table, adding it if it's new."""
+        index = self.index.get(text)
+        if index is None:
+            if ILLEGAL_CHARACTERS_RE.search(text):
+                raise IllegalCharacterError(f"{text} cannot be used in worksheets.")
+            index = self.index[text] = len(self.index)
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def to_xml(self):
+        items = ''.join(f'<si><t xml:space="preserve">{escape(text)}</t></si>' for text in self.index)
+        return (f'<sst xmlns="{SHEET_MAIN_NS}" uniqueCount="{len(self.index)}">{items}</sst>').encode('utf-8')
+
+
+class _SharedStringsPart:
+    path = '/' + ARC_SHARED_STRINGS
+    mime_type = SHARED_STRINGS
+
+
+def style_id(wb, font=None, fill=None, border=None, alignment=None):
+    """Cell style id of the given font, fill, border and alignment in wb, as setting them on a cell would give."""
+    style = StyleArray()
+    if font is not None:
+        style.fontId = wb._fonts.add(font)
+    if fill is not None:
+        style.fillId = wb._fills.add(fill)
+    if border is not None:
+        style.borderId = wb._borders.add(border)
+    if alignment is not None:
+        style.alignmentId = wb._alignments.add(alignment)
+    return wb._cell_styles.add(style)
+
+
+def empty_cell(style):
+    """XML of a styled cell without a value."""
+    return f'<c s="{style}"/>'
+
+
+def number_cell(style, value):
+    return f'<c s="{style}"><v>{value}</v></c>'
+
+
+def string_cell(style, index):
+    """XML of a cell holding shared string index."""
+    return f'<c s="{style}" t="s"><v>{index}</v></c>'
+
+
+class StreamingWorkbook(Workbook):
+    """A Workbook that can take whole runs of rows as ready-made worksheet XML.
+
+    The hot sheets of the reports have one styled cell per employee per date, and building
+    an openpyxl cell object for each is most of their cost. Their generators instead give
+    stream_rows the rows' XML, put together from per-style cell templates and indexes into
+    the shared strings table, and save writes it straight into the sheet's zip entry
+    around the sheet's other rows and settings. Cells in streamed rows have no 'r' attribute,
+    so every row must hold a cell for each column from A up to its last.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.shared_strings = SharedStrings()
+        self.row_streams = {}
+
+    def style_id(self, font=None, fill=None, border=None, alignment=None):
+        return style_id(self, font, fill, border, alignment)
+
+    def cell_xml(self, style, value=None):
+        """XML of a cell with the style id and value (None, text or a number)."""
+        if value is None or value == '':
+            return empty_cell(style)
+        if isinstance(value, str):
+            return string_cell(style, self.shared_strings.add(value))
+        if isinstance(value, bool):
+            return f'<c s="{style}" t="b"><v>{int(value)}</v></c>'
+        return number_cell(style, value)
+
+    def stream_rows(self, ws, first_row, last_row, max_column, rows):
+        """Write rows first_row to last_row of ws from rows, an iterable of (row number, cells XML).
+
+        The rows are consumed when the workbook is saved. ws must have no cells of its own
+        in that range, and merged ranges there go straight into ws.merged_cells beforehand,
+        as ws.merge_cells and MergedCellRange create cells.
+        """
+        if ws in self.row_streams:
+            raise ValueError(f"Rows are already streamed into {ws.title}")
+        self.row_streams[ws] = RowStream(first_row, last_row, max_column, rows)
+
+    def remove(self, worksheet):
+        self.row_streams.pop(worksheet, None)
+        super().remove(worksheet)
+
+    def save(self, filename, compress_level=None):
+        """Save the workbook, writing streamed rows and the shared strings table as it goes."""
+        write_workbook(self, filename, compress_level)
+
+
+def write_workbook(wb, filename, compress_level=None):
+    """Write any workbook as an xlsx zip at a zlib compression level.
+
+    compress_level runs from 0, which stores the parts uncompressed, to 9; None is zlib's
+    default (6). filename may be a path or a writable file object.
+    """
+    if wb.read_only:
+        raise TypeError("Workbook is read-only")
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+    streamed = isinstance(wb, StreamingWorkbook) and (wb.row_streams or wb.shared_strings)
+    if compress_level == 0:
+        compression, compress_level = ZIP_STORED, None
+    else:
+        compression = ZIP_DEFLATED
+    archive = (_StreamingArchive if streamed else ZipFile)(filename, 'w', compression, allowZip64=True,
+                                                           compresslevel=compress_level)
+    wb.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    (StreamingExcelWriter if streamed else ExcelWriter)(wb, archive).save()
+
+
+class _StreamingArchive(ZipFile):
+    """Zip archive that adds the shared strings part to the workbook relationships as they're written."""
+
+    def writestr(self, zinfo_or_arcname, data, *args, **kwargs):
+        if zinfo_or_arcname == ARC_WORKBOOK_RELS:
+            rels = RelationshipList.from_tree(fromstring(data))
+            rels.append(Relationship(type='sharedStrings', Target='sharedStrings.xml'))
+            data = tostring(rels.to_tree())
+        super().writestr(zinfo_or_arcname, data, *args, **kwargs)
+
+
+class _SkeletonWriter(WorksheetWriter):
+    """Writes a sheet's own cells and settings, with the dimension covering its streamed rows too."""
+
+    def __init__(self, ws, stream):
+        self.stream = stream
+        super().__init__(ws, out=BytesIO())
+
+    def write_dimensions(self):
+        ws, stream = self.ws, self.stream
+        min_row, max_row, max_col = stream.first_row, stream.last_row, stream.max_column
+        if ws._cells:
+            min_row, max_row, max_col = min(min_row, ws.min_row), max(max_row, ws.max_row), max(max_col, ws.max_column)
+        self.xf.send(SheetDimension(f"A{min_row}:{get_column_letter(max_col)}{max_row}").to_tree())
+
+
+class StreamingExcelWriter(ExcelWriter):
+    """ExcelWriter that splices each sheet's streamed rows into its XML inside the zip entry."""
+
+    def write_worksheet(self, ws):
+        stream = self.workbook.row_streams.get(ws)
+        if stream is None:
+            super().write_worksheet(ws)
+            return
+
+        ws._drawing = SpreadsheetDrawing()
+        ws._drawing.charts = ws._charts
+        ws._drawing.images = ws._images
+        writer = _SkeletonWriter(ws, stream)
+        writer.write()
+        ws._rels = writer._rels
+        head, tail = self._split_sheet(writer.read(), stream)
+
+        with self._archive.open(ws.path[1:], 'w', force_zip64=True) as out:
+            out.write(head)
+            chunk, size = [], 0
+            for row_number, cells in stream.rows:
+                text = f'<row r="{row_number}">{cells}</row>'
+                chunk.append(text)
+                size += len(text)
+                if size >= STREAM_CHUNK_SIZE:
+                    out.write(''.join(chunk).encode('utf-8'))
+                    chunk, size = [], 0
+            out.write(''.join(chunk).encode('utf-8'))
+            out.write(tail)
+        self.manifest.append(ws)
+
+    @staticmethod
+    def _split_sheet(xml, stream):
+        """Split sheet XML at the point the streamed rows go: (before, after)."""
+        empty = EMPTY_SHEET_DATA.search(xml)
+        if empty:
+            return xml[:empty.start()] + b'<sheetData>', b'</sheetData>' + xml[empty.end():]
+        for match in ROW_TAG.finditer(xml):
+            row_number = int(match.group(1))
+            if stream.first_row <= row_number <= stream.last_row:
+                raise ValueError(f"Row {row_number} has cells but is streamed")
+            if row_number > stream.last_row:
+                return xml[:match.start()], xml[match.start():]
+        end = xml.index(b'</sheetData>')
+        return xml[:end], xml[end:]
+
+    def _write_worksheets(self):
+        super()._write_worksheets()
+        self._archive.writestr(ARC_SHARED_STRINGS, self.workbook.shared_strings.to_xml())
+        self.manifest.append(_SharedStringsPart())
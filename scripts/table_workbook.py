@@ -0,0 +1,142 @@
+import os
+import warnings
+from datetime import datetime
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+
+from scripts.data_export import leave_long_frame
+from scripts.leave_summary import SUMMARY_SHEET_NAME, LeaveSummary
+from scripts.sheet_limits import MAX_ROWS, chunk_sizes
+from scripts.workbook_saver import WorkbookSaver
+
+TABLE_SHEET_NAME = 'Leave Data'
+TABLE_NAME = 'LeaveData'
+TABLE_STYLE = 'TableStyleMedium2'
+
+# Table header per long-frame column, and the column widths
+TABLE_COLUMNS = [
+    ('Employee_Code', 'Employee Code', 14),
+    ('Employee_Name', 'Employee Name', 30),
+    ('Employment_Type_Name', 'Employment Type', 18),
+    ('Location', 'Location', 30),
+    ('Department', 'Department', 20),
+    ('Role', 'Role', 20),
+    ('Date', 'Date', 12),
+    ('Status', 'Status', 12),
+]
+DEPARTMENTS_SHEET_NAME = 'Top Departments'
+
+
+class TableWorkbookGenerator:
+    """The leave data as one native Excel Table in long format, plus small summary sheets.
+
+    Every leave day is one table row per work area with typed columns, so readers filter,
+    sort and pivot it in Excel themselves instead of us rendering a styled grid per
+    location. The workbook is written in write-only mode with no per-cell styling beyond
+    the summary headers, which keeps both the write time and the file small.
+    """
+
+    def __init__(self, leave_matrix):
+        self.matrix = leave_matrix
+        self.wb = Workbook(write_only=True)
+        self.bold = Font(bold=True)
+
+    def _header_row(self, ws, headers):
+        row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = self.bold
+            row.append(cell)
+        return row
+
+    def _rate_cell(self, ws, rate):
+        cell = WriteOnlyCell(ws, value=round(float(rate), 4))
+        cell.number_format = '0.0%'
+        return cell
+
+    def _generate_summary_sheet(self, summary):
+        """Leave days by status and by location per week, with each location's absence rate."""
+        ws = self.wb.create_sheet(SUMMARY_SHEET_NAME)
+        ws.column_dimensions['A'].width = 30
+        weeks = summary.week_labels
+        total_days = max(int(np.sum(summary.week_days)), 1)
+
+        ws.append(self._header_row(ws, ['Status'] + weeks + ['Total']))
+        for status_index, name in enumerate(summary.statuses):
+            days = summary.by_status[status_index]
+            if days.any():
+                ws.append([name] + days.tolist() + [int(days.sum())])
+        ws.append(['Total'] + summary.by_status.sum(axis=0).tolist() + [int(summary.by_status.sum())])
+        ws.append([])
+
+        ws.append(self._header_row(ws, ['Location'] + weeks + ['Total', 'Employees', 'Rate']))
+        for location_index, (location, headcount) in enumerate(summary.locations):
+            days = summary.by_location[:, location_index, :].sum(axis=0)
+            if days.any():
+                ws.append([location] + days.tolist() +
+                          [int(days.sum()), headcount, self._rate_cell(ws, days.sum() / (headcount * total_days))])
+
+    def _generate_departments_sheet(self, summary):
+        ws = self.wb.create_sheet(DEPARTMENTS_SHEET_NAME)
+        for col, width in enumerate([30, 20, 11, 11, 9, 14], 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        ws.append(self._header_row(ws, ['Location', 'Department', 'Employees', 'Leave Days', 'Rate',
+                                        'Peak On Leave']))
+        for location, department, headcount, leave_days, rate, peak in summary.top_departments:
+            ws.append([location, department, headcount, leave_days, self._rate_cell(ws, rate), peak])
+
+    def _generate_table_sheets(self):
+        """Write the long-format leave data as a table, on more sheets if it outgrows Excel's row limit."""
+        frame = leave_long_frame(self.matrix)
+        columns = [frame[name].dt.date.tolist() if name == 'Date' else frame[name].astype(object).tolist()
+                   for name, _, _ in TABLE_COLUMNS]
+        headers = [header for _, header, _ in TABLE_COLUMNS]
+
+        chunks = chunk_sizes(len(frame), MAX_ROWS - 1)
+        for number, (start, stop) in enumerate(chunks, 1):
+            suffix = '' if len(chunks) == 1 else f" ({number})"
+            ws = self.wb.create_sheet(TABLE_SHEET_NAME + suffix)
+            for col, (_, _, width) in enumerate(TABLE_COLUMNS, 1):
+                ws.column_dimensions[get_column_letter(col)].width = width
+            ws.freeze_panes = 'A2'
+            ws.append(headers)
+            for row in zip(*(column[start:stop] for column in columns)):
+                ws.append(row)
+
+            # A table needs at least one data row; write-only sheets don't fill in the table columns
+            last_row = max(stop - start, 1) + 1
+            table = Table(displayName=TABLE_NAME + ('' if number == 1 else str(number)),
+                          ref=f"A1:{get_column_letter(len(headers))}{last_row}",
+                          tableColumns=[TableColumn(id=col, name=header) for col, header in enumerate(headers, 1)])
+            table.tableStyleInfo = TableStyleInfo(name=TABLE_STYLE, showRowStripes=True)
+            with warnings.catch_warnings():
+                warnings.filterwarnings('ignore', message='In write-only mode you must add table columns manually')
+                ws.add_table(table)
+        print(f"Leave table: {len(frame)} rows")
+
+    def generate_report(self):
+        """Generate the summary sheets and the leave table."""
+        summary = LeaveSummary(self.matrix)
+        self._generate_summary_sheet(summary)
+        self._generate_departments_sheet(summary)
+        self._generate_table_sheets()
+
+    def save_report(self, directory, saver=None):
+        """Save the report with the specified naming convention, through saver (a WorkbookSaver) if given."""
+        current_date = datetime.now()
+        month_year = current_date.strftime("%d %b %Y")
+        filename = f"Leave Table {month_year}.xlsx"
+        filepath = os.path.join(directory, filename)
+        (saver or WorkbookSaver()).save(self.wb, filepath)
+
+
+def generate_table_workbook(leave_matrix, output_directory, saver=None):
+    """Main function to generate and save the leave table workbook."""
+    report_generator = TableWorkbookGenerator(leave_matrix)
+    report_generator.generate_report()
+    report_generator.save_report(output_directory, saver)
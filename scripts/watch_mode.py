@@ -0,0 +1,100 @@
+import os
+import time
+from datetime import datetime
+
+from scripts.file_loader import LoadCache, is_export_file, set_error_popups
+from scripts.report_pipeline import run_report_pipeline
+
+
+class ExportWatcher:
+    """Poll the input folder and regenerate the reports whenever a new export lands.
+
+    A change is only acted on once the set of Excel files has stopped changing for
+    `settle_seconds` and every file can be opened, so exports that are still being
+    copied or saved are not picked up half-written. Loaded DataFrames and the processed
+    EmployeeManager are kept in a LoadCache between runs. Any other keyword arguments
+    are passed on to run_report_pipeline.
+    """
+
+    def __init__(self, reports_dir, base_dir, poll_interval=2.0, settle_seconds=3.0, **pipeline_options):
+        self.reports_dir = reports_dir
+        self.base_dir = base_dir
+        self.pipeline_options = pipeline_options
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.cache = LoadCache()
+        self.last_processed = None
+
+    def _snapshot(self):
+        """Get (name, size, mtime) for every Excel export in the input folder."""
+        try:
+            names = os.listdir(self.reports_dir)
+        except FileNotFoundError:
+            return ()
+        snapshot = []
+        for name in sorted(names):
+            if not is_export_file(name):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.reports_dir, name))
+            except FileNotFoundError:
+                continue
+            snapshot.append((name, stat.st_size, stat.st_mtime_ns))
+        return tuple(snapshot)
+
+    def _files_readable(self, snapshot):
+        """Check every export can be opened - files still being written are locked on Windows."""
+        for name, _, _ in snapshot:
+            try:
+                with open(os.path.join(self.reports_dir, name), 'rb') as f:
+                    f.read(1)
+            except OSError:
+                return False
+        return True
+
+    def _wait_until_settled(self, snapshot):
+        """Wait for the folder contents to stop changing, returning the settled snapshot."""
+        stable_since = time.monotonic()
+        while True:
+            time.sleep(self.poll_interval)
+            current = self._snapshot()
+            if current != snapshot:
+                snapshot = current
+                stable_since = time.monotonic()
+            elif time.monotonic() - stable_since >= self.settle_seconds and self._files_readable(current):
+                return current
+
+    def run_once(self):
+        """Run the pipeline for the current exports."""
+        started = time.perf_counter()
+        print(f"\n[{datetime.now():%H:%M:%S}] Generating reports...")
+        try:
+            output_dir = run_report_pipeline(self.reports_dir, self.base_dir, cache=self.cache,
+                                             **self.pipeline_options)
+        except Exception as e:
+            print(f"Error: Report generation failed: {e}")
+            return None
+        if output_dir:
+            print(f"Published {os.path.basename(output_dir)} in {time.perf_counter() - started:.1f}s")
+        return output_dir
+
+    def watch(self):
+        """Regenerate on every settled change until interrupted with Ctrl+C."""
+        set_error_popups(False)
+        print(f"Watching {self.reports_dir} for new exports (Ctrl+C to stop)...")
+        try:
+            while True:
+                snapshot = self._snapshot()
+                if snapshot and snapshot != self.last_processed:
+                    snapshot = self._wait_until_settled(snapshot)
+                    # A failed run is retried on the next poll rather than waiting for the exports to change
+                    if self.run_once():
+                        self.last_processed = snapshot
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+
+
+def watch_reports(reports_dir, base_dir, poll_interval=2.0, settle_seconds=3.0, **pipeline_options):
+    """Main function to run the pipeline whenever the exports in reports_dir change."""
+    ExportWatcher(reports_dir, base_dir, poll_interval, settle_seconds, **pipeline_options).watch()
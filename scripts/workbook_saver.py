@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.sheet_stream import write_workbook
+
+# zlib level workbooks are saved at: 0 stores the sheet XML uncompressed (fastest, largest), 9 is smallest
+DEFAULT_COMPRESS_LEVEL = 6
+
+
+def save_workbook(wb, filepath, compress_level=DEFAULT_COMPRESS_LEVEL):
+    """Save wb to a temp file next to filepath and rename it into place, so filepath is never half-written."""
+    temp_path = filepath + '.tmp'
+    try:
+        write_workbook(wb, temp_path, compress_level)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class WorkbookSaver:
+    """Saves the report workbooks of a run at one compression level, in turn on a background thread if asked.
+
+    With background, save() hands the workbook to a single worker thread and returns, so
+    the caller renders the next workbook while this one is compressed and written; wait()
+    blocks until every save is done and raises the first one that failed. Used as a
+    context manager, leaving the block waits.
+    """
+
+    def __init__(self, compress_level=DEFAULT_COMPRESS_LEVEL, background=False):
+        self.compress_level = compress_level
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='workbook-saver') if background else None
+        self.pending = []
+
+    def _save(self, wb, filepath):
+        save_workbook(wb, filepath, self.compress_level)
+        print(f"Saved: {os.path.basename(filepath)}")
+
+    def save(self, wb, filepath):
+        """Save wb to filepath - now, or queued behind earlier saves when in the background."""
+        if self.executor is None:
+            self._save(wb, filepath)
+        else:
+            self.pending.append(self.executor.submit(self._save, wb, filepath))
+
+    def wait(self):
+        """Wait for the queued saves to finish, raising the first error."""
+        pending, self.pending = self.pending, []
+        errors = [future.exception() for future in pending]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.close()
+        except Exception:
+            if exc_type is None:  # Don't hide the error that ended the block
+                raise